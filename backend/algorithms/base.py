@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, Tuple, List, Any
+from typing import Dict, Tuple, List, Any, Optional
 import pandas as pd
 import numpy as np
 
 class BaseAlgorithm(ABC):
+    # 算法实际使用的实现变体（比如样本量很大时 K-means 改用 MiniBatchKMeans），由 fit_predict 按需设置
+    # 为 None 表示运行的就是前端选择的算法本身
+    variant: Optional[str] = None
+
     def __init__(self, **kwargs):
         """
         接收从前端传来的所有参数（K值、迭代次数等）
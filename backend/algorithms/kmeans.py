@@ -1,9 +1,33 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+try:
+    # Intel Extension for Scikit-learn（sklearnex）是可选依赖：接口和 sklearn 的 KMeans 完全一样，
+    # 底层换成 oneDAL 针对 AVX2/AVX-512 手工优化的距离内核和 OpenMP 多线程。没装的时候使用原版 sklearn
+    from sklearnex.cluster import KMeans
+except ImportError:
+    from sklearn.cluster import KMeans
+from . import kmeans_numba
 from .base import BaseAlgorithm
 
+MINIBATCH_THRESHOLD = 10_000  # 样本数超过这个值时改用 MiniBatchKMeans
+MINIBATCH_MIN_BATCH_SIZE = 1024
+MINIBATCH_MAX_BATCH_SIZE = 4096
+# numba 内核每个样本对每个中心都做一次点积，k 较大时不如 sklearn 用 BLAS 矩阵乘法一次算完所有距离，只在 k 不超过这个值时使用
+NUMBA_MAX_CLUSTERS = 16
+
+
+def _minibatch_size(n_samples: int, requested: int) -> int:
+    """MiniBatchKMeans 每批的样本数：用户指定了（> 0）就用用户的；否则取样本数的十分之一，限制在 [1024, 4096] 之间
+    （一万来个样本时仍是原来的 1024，样本越多批越大，中心估计越稳，迭代轮数也越少）"""
+    if requested > 0:
+        return requested
+    return min(MINIBATCH_MAX_BATCH_SIZE, max(MINIBATCH_MIN_BATCH_SIZE, n_samples // 10))
+
 class Algorithm(BaseAlgorithm):
+    # 为 True 时不管样本量多少都使用 MiniBatchKMeans（前端选择 "K-means-mini" 时，见 kmeans_mini.py）
+    force_minibatch = False
+
     def fit_predict(self, data: dict[str, pd.DataFrame]) -> tuple[np.ndarray, np.ndarray, list[str]]:
         # K-means 属于早期融合，在算法内部直接将多个组学进行内连接合并
         df_concat = pd.concat(data.values(), axis=1, join='inner')
@@ -13,13 +37,38 @@ class Algorithm(BaseAlgorithm):
         random_state = self.params.get('random_state', 42)
         max_iter = self.params.get('max_iter', 300)
         
-        # 初始化模型并训练
-        model = KMeans(
-            n_clusters=n_clusters, 
-            random_state=random_state, 
-            max_iter=max_iter
-        )
-        labels = model.fit_predict(df_concat)
+        # 只转换一次成 C 连续的 float32 矩阵：比 float64 少一半内存带宽，也省掉 sklearn 对 DataFrame 做校验时的那次拷贝
+        X = np.ascontiguousarray(df_concat.to_numpy(dtype=np.float32))
+        
+        if self.force_minibatch or X.shape[0] > MINIBATCH_THRESHOLD:
+            # 样本量很大时，全量 K-means 每轮迭代都要计算 N×k 个距离；MiniBatchKMeans 每轮只用一小批样本更新中心，
+            # 聚类质量和全量 K-means 基本一致，耗时却只有一小部分
+            if not self.force_minibatch:
+                self.variant = "MiniBatchKMeans" #自动切换的才需要标出来，用户主动选择的 K-means-mini 本身就是 MiniBatchKMeans
+            model = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                random_state=random_state,
+                max_iter=max_iter,
+                batch_size=_minibatch_size(X.shape[0], self.params.get('batch_size', -1)),
+                n_init=3
+            )
+            labels = model.fit_predict(X)
+        elif kmeans_numba.AVAILABLE and n_clusters <= NUMBA_MAX_CLUSTERS:
+            # 装了 numba 时使用编译好的 Lloyd 内核，初始化和收敛判据与 sklearn 一致
+            labels, _, _ = kmeans_numba.fit_predict(
+                X,
+                n_clusters=n_clusters,
+                random_state=random_state,
+                max_iter=max_iter,
+            )
+        else:
+            # 初始化模型并训练
+            model = KMeans(
+                n_clusters=n_clusters, 
+                random_state=random_state, 
+                max_iter=max_iter
+            )
+            labels = model.fit_predict(X)
         
         # 返回 聚类标签, 融合后的特征矩阵, 样本名称列表
-        return labels, df_concat.values, df_concat.index.tolist()
\ No newline at end of file
+        return labels, df_concat.values, df_concat.index.tolist()
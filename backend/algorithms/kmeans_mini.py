@@ -0,0 +1,5 @@
+from . import kmeans
+
+class Algorithm(kmeans.Algorithm):
+    # 参数和 K-means 完全一样，只是无论样本量多少都直接使用 MiniBatchKMeans，让用户在中小规模数据上也能主动选择更快的近似解
+    force_minibatch = True
@@ -0,0 +1,152 @@
+"""用 Numba 编译的 K-means（Lloyd 迭代）内核。
+
+sklearn 的 KMeans 每轮迭代都要经过一层 Python 调度，而 K-means 的“分配样本到最近
+中心 + 更新中心”两步是纯数值循环，非常适合交给 Numba 编译成机器码，并用 prange
+把样本循环分到多个 CPU 核上并行执行。
+
+numba 是可选依赖：没装的时候 AVAILABLE 为 False，kmeans.py 会继续使用 sklearn。
+"""
+
+import numpy as np
+from sklearn.cluster import kmeans_plusplus
+
+try:
+    from numba import config, get_num_threads, njit, prange
+except ImportError:
+    get_num_threads = njit = prange = None
+else:
+    # 聚类在进程池的子进程里运行（见 executors.py）。TBB 线程层在非主线程里启动过并行区后，解释器退出时会卡住，
+    # 而内核不一定总是从主线程调用，所以优先使用同样线程安全的 OpenMP 线程层
+    config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+
+AVAILABLE = njit is not None
+
+
+if AVAILABLE:
+    # fastmath=True 会打开 ninf/nnan 标志，而 _assign 用 np.inf 作为最小距离的初始值，在这两个标志下行为是未定义的。
+    # 所以只开与无穷大/NaN 无关的那几项，点积仍然可以重排、向量化
+    FASTMATH_FLAGS = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+    @njit(parallel=True, fastmath=FASTMATH_FLAGS, cache=True)
+    def _assign(X, X_norm, centroids):
+        """把每个样本分配给最近的中心，返回 (labels, 到所属中心的平方距离)
+
+        平方距离按 ||x - c||^2 = ||x||^2 - 2 x·c + ||c||^2 展开（sklearn 也是这么算的）：
+        ||x||^2 在整个迭代过程中不变，由调用方预先算好传进来；||c||^2 每轮只算 k 次；
+        内层循环只剩一次点积，每个特征一次乘加，比逐个特征相减再平方少一半运算。
+        """
+        n_samples, n_features = X.shape
+        n_clusters = centroids.shape[0]
+        centroid_norm = np.empty(n_clusters, dtype=X.dtype)
+        for j in range(n_clusters):
+            norm = 0.0
+            for f in range(n_features):
+                norm += centroids[j, f] * centroids[j, f]
+            centroid_norm[j] = norm
+        labels = np.empty(n_samples, dtype=np.int64)
+        distances = np.empty(n_samples, dtype=X.dtype)
+        for i in prange(n_samples):
+            best_label = 0
+            best_distance = np.inf
+            for j in range(n_clusters):
+                dot = 0.0
+                for f in range(n_features):
+                    dot += X[i, f] * centroids[j, f]
+                distance = X_norm[i] - 2.0 * dot + centroid_norm[j]
+                if distance < best_distance:
+                    best_distance = distance
+                    best_label = j
+            labels[i] = best_label
+            distances[i] = max(best_distance, 0.0)  # 展开式在浮点下可能得到极小的负数
+        return labels, distances
+
+    @njit(parallel=True, cache=True)
+    def _update(X, labels, n_clusters, n_chunks):
+        """按当前标签重新计算每个簇的中心，返回 (centroids, 每个簇的样本数)
+
+        样本分成 n_chunks 段（调用方传入线程数），每段用 prange 并行地累加到自己的一份部分和里
+        （各线程写不同的缓冲区，不需要加锁），最后再把各段的部分和加起来。
+        """
+        n_samples, n_features = X.shape
+        n_chunks = max(1, min(n_chunks, n_samples))
+        chunk_size = (n_samples + n_chunks - 1) // n_chunks
+        partial_sums = np.zeros((n_chunks, n_clusters, n_features), dtype=X.dtype)
+        partial_counts = np.zeros((n_chunks, n_clusters), dtype=np.int64)
+        for c in prange(n_chunks):
+            for i in range(c * chunk_size, min((c + 1) * chunk_size, n_samples)):
+                label = labels[i]
+                partial_counts[c, label] += 1
+                for f in range(n_features):
+                    partial_sums[c, label, f] += X[i, f]
+
+        centroids = np.zeros((n_clusters, n_features), dtype=X.dtype)
+        counts = np.zeros(n_clusters, dtype=np.int64)
+        for c in range(n_chunks):
+            for j in range(n_clusters):
+                counts[j] += partial_counts[c, j]
+                for f in range(n_features):
+                    centroids[j, f] += partial_sums[c, j, f]
+        for j in range(n_clusters):
+            if counts[j] > 0:
+                for f in range(n_features):
+                    centroids[j, f] /= counts[j]
+        return centroids, counts
+
+
+def fit_predict(
+    X: np.ndarray,
+    n_clusters: int,
+    random_state: int | None = None,
+    max_iter: int = 300,
+    tol: float = 1e-4,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """运行一次 K-means，返回 (labels, centroids, inertia)
+
+    初始化沿用 sklearn 的 k-means++（同一个 random_state 得到与 sklearn KMeans 相同的初始中心），
+    收敛判据也与 sklearn 一致：标签不再变化，或中心总位移小于 tol * 各特征方差的均值。
+    """
+    if not AVAILABLE:
+        raise RuntimeError("numba is not installed")
+
+    X = np.ascontiguousarray(X)
+    X_norm = np.einsum("ij,ij->i", X, X)  # 每个样本的平方范数，初始化和整个迭代过程中只算一次
+    # sklearn 的 k-means++ 本身已经是向量化的（每一步用一次矩阵运算算完所有候选中心的距离），
+    # 把上面算好的平方范数传进去，省掉它内部再算一遍
+    centroids, _ = kmeans_plusplus(X, n_clusters, x_squared_norms=X_norm, random_state=random_state)
+    centroids = np.ascontiguousarray(centroids, dtype=X.dtype)
+    tol = tol * float(np.mean(np.var(X, axis=0)))
+    n_threads = get_num_threads()  # 线程数在 Python 这边取好传给 _update，内核里读它会让 cache=True 的磁盘缓存失效
+
+    labels, distances = _assign(X, X_norm, centroids)
+    for _ in range(max_iter):
+        new_centroids, counts = _update(X, labels, n_clusters, n_threads)
+        # 空簇处理：和 sklearn 一样，把空簇的中心挪到离自己中心最远的样本上
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            farthest = np.argsort(distances)[::-1][: empty.size]
+            new_centroids[empty] = X[farthest]
+
+        center_shift = float(((new_centroids - centroids) ** 2).sum())
+        centroids = new_centroids
+        new_labels, distances = _assign(X, X_norm, centroids)
+        converged = np.array_equal(new_labels, labels) or center_shift <= tol
+        labels = new_labels
+        if converged:
+            break
+
+    return labels, centroids, float(distances.sum())
+
+
+def warmup() -> None:
+    """用一个很小的输入把所有内核各调用一次，提前触发编译（或从 cache=True 的磁盘缓存里加载），
+    这样第一个真实的 K-means 请求就不用承担几秒到几十秒的冷启动编译时间"""
+    if not AVAILABLE:
+        return
+    # kmeans.py 传进来的是 float32 矩阵，预热时用同样的 dtype，才能编译出同一个特化版本
+    X = np.array([[0.0, 0.0, 0.0], [0.1, 0.0, 0.1], [5.0, 5.0, 5.0], [5.1, 5.0, 4.9]], dtype=np.float32)
+    fit_predict(X, n_clusters=2, random_state=0, max_iter=2)
+
+
+if __name__ == "__main__":
+    # 在 Docker 镜像构建等场景下可以提前执行 python -m algorithms.kmeans_numba，把编译结果写入磁盘缓存
+    warmup()
@@ -18,6 +18,8 @@ class Algorithm(BaseAlgorithm):
             random_state=random_state,
             affinity='nearest_neighbors'
         )
-        labels = model.fit_predict(df_concat)
+        # 和 K-means 一样，只转换一次成 C 连续的 float32 矩阵再交给 sklearn：近邻图的距离计算少一半内存带宽，也省掉 sklearn 对 DataFrame 的那次 float64 拷贝
+        X = np.ascontiguousarray(df_concat.to_numpy(dtype=np.float32))
+        labels = model.fit_predict(X)
         
         return labels, df_concat.values, df_concat.index.tolist()
\ No newline at end of file
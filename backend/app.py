@@ -1,10 +1,15 @@
 import os
-os.environ["OMP_NUM_THREADS"]="5" #在Windows上搭配底层MKL库运行K-means时有一个已知内存泄漏问题（当数据块少于可用线程时会触发）。因此官方警告推荐写上这句代码，强行限制底层数学库使用的CPU线程数量为5
+import sys
+if sys.platform=="win32": #在Windows上搭配底层MKL库运行K-means时有一个已知内存泄漏问题（当数据块少于可用线程时会触发）。因此官方警告推荐写上这句代码，强行限制底层数学库使用的CPU线程数量为5
+    os.environ.setdefault("OMP_NUM_THREADS","5") #setdefault：用户自己设置了OMP_NUM_THREADS时以用户的为准
+#Linux/macOS没有这个问题，不做限制，sklearn的K-means（默认lloyd算法，OpenMP多线程）、BLAS和numba内核都能用满所有CPU核心
 import warnings
 warnings.filterwarnings("ignore",category=FutureWarning) #忽略类别=未来警告的警告，不让这种类别的警告打印到控制台，污染日志。为什么会有这种类别的警告？就比如snfpy库在底层调用sklearn的验证函数时，还在使用旧的未来版本会弃用的参数名force_all_finite，于是sklearn会发出警告提醒你，调用一次提醒一次
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from cleanup import lifespan #导入我们在./cleanup.py里写的后台定时清理任务的生命周期管理器 #这里也不能使用相对导入
+from responses import ORJSONResponse #导入我们在./responses.py里写的基于orjson的响应类
 
 # =============================================================================
 # 应用程序初始化
@@ -17,19 +22,37 @@ app=FastAPI(
     title="OmicsInferenceDeck API Platform", #设置API文档的标题
     description="Backend for Multi-Omics Cancer Subtyping Platform", #设置API的描述信息
     version="1.0.0", #设置版本号
-    lifespan=lifespan #挂载生命周期管理器
+    lifespan=lifespan, #挂载生命周期管理器
+    default_response_class=ORJSONResponse #所有接口默认用orjson序列化响应体，比标准库json快得多，返回很长的labels列表或SVG字符串时尤其明显
 )
 
 #配置CORS（跨域资源共享）中间件
-#在前后端分离架构中，前端通常运行在5173端口，后端在8000端口。浏览器出于安全策略默认禁止这种跨端口请求，因此必须配置CORS中间件来显式允许
+#在前后端分离架构中，前端通常运行在3000端口（Nuxt开发服务器，旧版Vite前端是5173端口），后端在8000端口。浏览器出于安全策略默认禁止这种跨端口请求，因此必须配置CORS中间件来显式允许
+#注意"*"和allow_credentials=True不能同时使用：规范不允许带凭证的请求匹配通配符，Starlette只能对每个请求动态回显Origin头，既不安全又多了一段逐请求的处理
+#所以这里明确列出允许的源。如果要让局域网里的其他电脑访问，启动前设置环境变量，比如 CORS_ALLOW_ORIGINS="http://192.168.1.10:3000,http://localhost:3000"
+CORS_ALLOW_ORIGINS=[
+    origin.strip()
+    for origin in os.environ.get(
+        "CORS_ALLOW_ORIGINS",
+        "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173",
+    ).split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[ #允许的源列表
-        "*" #通配符，表示允许任何域名访问（仅在开发调试阶段使用，生产环境需严格限制）
-    ],
+    allow_origins=CORS_ALLOW_ORIGINS, #允许的源列表
     allow_credentials=True, #允许请求携带凭证（如Cookies、Authorization头）
-    allow_methods=["*"], #允许的HTTP方法（GET、POST、PUT、DELETE、OPTIONS等）
-    allow_headers=["*"], #允许的HTTP请求头（Content-Type、Accept等）
+    allow_methods=["GET","POST"], #前端只用到了GET和POST
+    allow_headers=["Content-Type"], #前端会发送的请求头
+    expose_headers=["Content-Disposition"], #允许前端JS读取的响应头：下载图片时要读文件名
+)
+
+#配置GZip压缩中间件
+#聚类标签列表、SVG图片这类响应体重复度很高，压缩后通常只剩原来的几分之一。浏览器请求头里带了Accept-Encoding: gzip时才会压缩
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024, #小于1KB的响应不压缩，压缩带来的收益抵不上CPU开销
+    compresslevel=5, #压缩级别1~9，5在压缩率和速度之间比较均衡
 )
 
 # =============================================================================
@@ -16,12 +16,37 @@ import asyncio
 from contextlib import asynccontextmanager
 from typing import List
 
+from executors import shutdown_process_pool
+from logger import logger
+
 # 清理间隔时间（秒）
 CLEANUP_INTERVAL = 6 * 60 * 60  # 6小时
 
 # 上传文件存放目录
 UPLOAD_DIR = "upload"
 
+# gunicorn 的每个 worker 进程都会执行一遍 lifespan，只有拿到这个文件锁的那一个 worker 运行清理任务
+CLEANUP_LOCK_FILE = os.path.join(UPLOAD_DIR, ".cleanup.lock")
+
+
+def _acquire_cleanup_lock():
+    """尝试拿到清理任务的文件锁，拿到时返回打开的锁文件（保持打开即持有锁，进程退出时自动释放），否则返回 None
+
+    Windows 上没有 fcntl，但那里也只会以单进程的 uvicorn 运行，直接返回锁文件即可。
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    lock_file = open(CLEANUP_LOCK_FILE, "a")
+    try:
+        import fcntl
+    except ImportError:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError: #锁已经被别的 worker 拿走了
+        lock_file.close()
+        return None
+    return lock_file
+
 
 async def cleanup_expired_folders():
     """
@@ -38,7 +63,7 @@ async def cleanup_expired_folders():
         if not os.path.exists(UPLOAD_DIR):
             continue
             
-        print(f"\n[后台任务] 开始清理 {UPLOAD_DIR} 下的过期文件夹...")
+        logger.info(f"[后台任务] 开始清理 {UPLOAD_DIR} 下的过期文件夹...")
         current_time = time.time()
         
         # 遍历 upload 文件夹下的所有内容
@@ -54,9 +79,9 @@ async def cleanup_expired_folders():
                 if current_time - folder_mtime > CLEANUP_INTERVAL:
                     try:
                         shutil.rmtree(folder_path)
-                        print(f"[后台任务] 成功删除过期文件夹: {folder_name}")
+                        logger.info(f"[后台任务] 成功删除过期文件夹: {folder_name}")
                     except Exception as e:
-                        print(f"[后台任务] 删除过期文件夹 {folder_name} 失败: {str(e)}")
+                        logger.error(f"[后台任务] 删除过期文件夹 {folder_name} 失败: {str(e)}")
 
 # 定义 FastAPI 的生命周期管理器
 @asynccontextmanager #这是目前 FastAPI 官方推荐的处理“服务器启动/关闭事件”的标准做法，用于替代旧版本会报警告的 @app.on_event("startup") 装饰器。
@@ -72,11 +97,16 @@ async def lifespan(app):
     app : FastAPI
         FastAPI 应用实例
     """
-    # 【启动服务器时】创建并启动后台清理任务
-    task = asyncio.create_task(cleanup_expired_folders())
+    # Numba K-means 内核的预热在进程池子进程启动时进行（见 executors.py），Web worker 自己不运行聚类，不用预热
+    # 创建并启动后台清理任务。多个 worker 进程时只在拿到文件锁的那一个里运行，避免几个 worker 同时 rmtree 同一个文件夹
+    cleanup_lock = _acquire_cleanup_lock()
+    task = asyncio.create_task(cleanup_expired_folders()) if cleanup_lock is not None else None
     yield  # 交出控制权，让 FastAPI 正常启动并处理请求
-    # 【关闭服务器时】取消清理任务，优雅退出
-    task.cancel()
+    # 【关闭服务器时】取消清理任务，关闭聚类进程池，优雅退出
+    if task is not None:
+        task.cancel()
+        cleanup_lock.close()
+    shutdown_process_pool()
 
 
 
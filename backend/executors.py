@@ -0,0 +1,80 @@
+# =============================================================================
+# 进程池
+# =============================================================================
+
+"""
+进程池模块
+
+聚类算法是纯 CPU 计算，放在默认线程池里跑时依然要和处理其他请求的 Python 代码争抢 GIL，
+一个耗时几十秒的聚类任务会让整个服务器的响应都变慢。
+这里维护一个全局的进程池，把聚类任务交给独立的子进程执行，彻底绕开 GIL，
+多个用户同时运行聚类时也能分别占用不同的 CPU 核心。
+
+提交给进程池的函数和参数都必须能被 pickle，所以只能是模块顶层定义的函数。
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# 子进程数量：每个 Web worker 进程都有自己的一个进程池，所以把 CPU 核心数平分给各个 Web worker
+# （main.py 用 gunicorn 启动多个 worker 时会把 worker 数写进环境变量 WEB_CONCURRENCY；单进程 uvicorn 时就是全部核心），
+# 否则 (2c+1) 个 worker 各开 c 个子进程，8 核机器上就是上百个进程
+WEB_WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY") or 1))
+PROCESS_POOL_WORKERS = max(1, (os.cpu_count() or 1) // WEB_WORKERS)
+# 每个子进程里 numba/OpenMP/BLAS 能用的线程数：这些库默认每个都按全部核心开线程，
+# 所有 Web worker 的所有子进程同时跑聚类时就是 (2c+1)×c 个计算线程抢 c 个核心。
+# 所以把核心数再平分给全部子进程（默认配置下每个子进程一个线程），并发请求多时各自占一个核心，互不抢占；
+# 代价是只有一个请求在跑时它也只用一个核心。想让单个请求用满多核，就用 WEB_CONCURRENCY 把 Web worker 数调小
+PROCESS_POOL_THREADS = max(1, (os.cpu_count() or 1) // (WEB_WORKERS * PROCESS_POOL_WORKERS))
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _init_worker() -> None:
+    """每个子进程启动时执行一次：限制计算线程数，并预热 Numba 编译的 K-means 内核
+
+    K-means 只在子进程里运行，第一次调用时要从磁盘缓存加载（或重新编译）内核。在子进程启动时就做掉，
+    第一个落到这个子进程上的 K-means 请求就不用承担这段冷启动时间。
+    """
+    # 还没加载的 OpenMP/BLAS 库启动时读环境变量；已经加载的（spawn 时重新导入主模块就会带进 numpy 等）由 threadpoolctl 在下面统一限制
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(name, str(PROCESS_POOL_THREADS))
+
+    from threadpoolctl import threadpool_limits
+    from algorithms import kmeans_numba
+    if kmeans_numba.AVAILABLE:
+        import numba
+        numba.set_num_threads(min(PROCESS_POOL_THREADS, numba.config.NUMBA_NUM_THREADS))
+    threadpool_limits(limits=PROCESS_POOL_THREADS)  # 导入 kmeans_numba 时 sklearn/scipy 的 OpenMP 和 BLAS 库也已经加载了
+    kmeans_numba.warmup()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    获取全局进程池，第一次调用时才创建；进程池因为子进程崩溃而不可用时重新创建
+
+    使用 spawn 而不是 Linux 默认的 fork 启动子进程：父进程里已经有事件循环线程、
+    Numba/OpenMP 线程池等在运行，fork 只会复制当前线程，子进程里的锁状态可能是坏的。
+    """
+    global _process_pool
+    if _process_pool is not None and _process_pool._broken:
+        # 某个子进程意外退出（比如大矩阵 OOM 被杀、R/numba 段错误）后，整个进程池会被标记为 broken，
+        # 之后的 submit 全都直接抛 BrokenProcessPool。丢掉坏掉的进程池重新建一个，不用重启服务器
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """关闭全局进程池，取消还在排队的任务，并等待正在执行的任务结束"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
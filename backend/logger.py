@@ -0,0 +1,75 @@
+# =============================================================================
+# 日志
+# =============================================================================
+
+"""
+日志模块
+
+print 每调用一次都要拿 GIL、往 stdout 写一行并立即 flush，所有请求处理函数都会在这里排队。
+这里改用标准库 logging：请求处理代码通过 QueueHandler 只是往内存队列里追加一条记录，
+真正格式化和写终端的工作交给 QueueListener 的后台线程去做。
+后台线程也不是每条日志都写一次终端：它先把格式化好的日志攒起来，等队列被取空时再一次性写出去，
+请求密集时多条日志只需要一次 write 系统调用。
+
+环境变量 INFERENCEDECK_LOG_LEVEL 可以调整日志级别，比如生产环境设为 WARNING 就不再输出 INFO 日志。
+"""
+
+import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get("INFERENCEDECK_LOG_LEVEL", "INFO").upper()
+
+_log_queue: queue.Queue = queue.Queue(-1)  # 不限长度，写日志永远不会阻塞
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """emit 只把格式化好的日志追加到缓冲区，flush 时才一次性写入终端"""
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._buffer: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            if self._buffer:
+                self.stream.write("".join(self._buffer))
+                self._buffer.clear()
+            super().flush()
+
+
+class _BatchingQueueListener(QueueListener):
+    """队列被取空、后台线程准备阻塞等待下一条日志之前，先把攒下的日志写出去"""
+
+    def dequeue(self, block: bool):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return super().dequeue(block)
+
+    def stop(self) -> None:
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+_stream_handler = _BatchingStreamHandler()
+_stream_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+
+# 后台线程：从队列里取出日志记录，再交给真正写终端的 handler
+_listener = _BatchingQueueListener(_log_queue, _stream_handler, respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)  # 进程退出前把队列里剩下的日志写完
+
+logger = logging.getLogger("inferencedeck")
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False  # 不再交给 root logger，避免和 uvicorn 的日志配置重复输出
@@ -1,13 +1,71 @@
+import os
+import sys
+import shutil
+import importlib.util
 import uvicorn
 from app import app #导入我们在./app.py里写的app #由于 main.py 是作为直接运行的脚本，它不能使用相对导入（如 from .server import app），必须使用绝对导入
 
+KEEP_ALIVE_SECONDS=30 #HTTP keep-alive 空闲连接保持的秒数。前端跑完聚类后会连续请求指标、散点图等接口，复用同一个TCP连接就不用每次重新握手（uvicorn默认只保持5秒，gunicorn默认2秒）
+
+
+def _event_loop() -> str:
+    """uvloop 是基于 libuv 的事件循环，比标准库 asyncio 的默认循环更快；但它不支持 Windows，装不上时回退到 asyncio"""
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return "uvloop"
+
+
+def _http_protocol() -> str:
+    """httptools 是 C 实现的 HTTP 解析器，比纯 Python 的 h11 更快；没装的话回退到 h11"""
+    try:
+        import httptools  # noqa: F401
+    except ImportError:
+        return "h11"
+    return "httptools"
+
+
+def _gunicorn_argv() -> list[str] | None:
+    """
+    用 gunicorn 启动多个 Uvicorn worker 进程的命令行；不满足条件时返回 None，退回单进程的 uvicorn.run
+
+    单个 Uvicorn 进程受 GIL 限制，最多只能用满一个 CPU 核心。gunicorn 会同时拉起多个 worker 进程，
+    每个 worker 都是一个完整的 Uvicorn 服务器，CPU 密集的请求就能分摊到多个核心上。
+    会话数据都保存在 upload/ 目录下而不是进程内存里，所以任意一个 worker 处理同一个会话的请求都没问题。
+    gunicorn 不支持 Windows，没装 gunicorn 或 uvicorn-worker 时也会退回 uvicorn.run。
+    """
+    if sys.platform == "win32" or shutil.which("gunicorn") is None or importlib.util.find_spec("uvicorn_worker") is None:
+        return None
+    workers = os.environ.get("WEB_CONCURRENCY") or str(2 * (os.cpu_count() or 1) + 1) #worker数量，默认2*CPU核心数+1，可以用环境变量WEB_CONCURRENCY覆盖。worker越多，每个聚类子进程分到的计算线程越少（见executors.py），并发吞吐高、单个请求慢；调小则反过来
+    os.environ["WEB_CONCURRENCY"] = workers #execvp 后 gunicorn 和各个 worker 都会继承这个环境变量，executors.py 据此给每个 worker 的聚类进程池分配核心数
+    argv = [
+        "gunicorn", "app:app",
+        "--pythonpath", os.path.dirname(os.path.abspath(__file__)), #和直接运行main.py时一样，从main.py所在目录导入app，不要求当前工作目录就是backend
+        "-k", "uvicorn_worker.UvicornWorker", #每个worker都是一个Uvicorn服务器（会自动使用uvloop和httptools）
+        "-w", workers,
+        "-b", "0.0.0.0:8000",
+        "--timeout", "0", #不限制单个请求的处理时间。有些分析要跑很久，gunicorn默认30秒没响应就会杀掉worker
+        "--keep-alive", str(KEEP_ALIVE_SECONDS), #UvicornWorker会把它作为Uvicorn的timeout_keep_alive
+    ]
+    if os.path.isdir("/dev/shm"):
+        argv += ["--worker-tmp-dir", "/dev/shm"] #worker的心跳文件放在内存文件系统里，避免磁盘IO慢时心跳被误判为超时
+    return argv
+
+
 # =============================================================================
 # 程序入口
 # =============================================================================
 if __name__=="__main__": #这是Python的标准入口判断。只有当这个文件被直接运行（而不是作为模块被导入）（即python main.py）时，下面的代码才会执行
-    #启动Uvicorn服务器
+    #Linux/macOS上优先用gunicorn启动多个worker进程。os.execvp会把当前Python进程直接替换成gunicorn进程，之后的代码不会再执行
+    gunicorn_argv=_gunicorn_argv()
+    if gunicorn_argv is not None:
+        os.execvp(gunicorn_argv[0],gunicorn_argv)
+
+    #启动Uvicorn服务器（单进程，Windows或没装gunicorn时）
     #我们刚才不是实例化了一个app对象嘛，现在我们将app作为参数传给Uvicorn服务器，于是当服务器收到请求时，可以找到并调用对应的有@app.post修饰的函数
-    uvicorn.run(app,host="0.0.0.0",port=8000) #这句代码的意思就是让Uvicorn服务器加载app这个对象，并且在所有网卡（0.0.0.0）上监听 8000 端口，随时接收请求
+    uvicorn.run(app,host="0.0.0.0",port=8000,loop=_event_loop(),http=_http_protocol(),timeout_keep_alive=KEEP_ALIVE_SECONDS) #这句代码的意思就是让Uvicorn服务器加载app这个对象，并且在所有网卡（0.0.0.0）上监听 8000 端口，随时接收请求
     #host="0.0.0.0"对应底层Socket编程中的INADDR_ANY宏，意思是监听本机“所有”网卡接口。也就是说允许外部设备（如同一局域网下的其他电脑）访问本服务
+    #loop和http显式指定为uvloop和httptools（装不上时自动回退），这样事件循环和HTTP解析都走C实现，每个请求的框架开销更小
     #一旦执行这句代码，主线程将进入一个无限循环，持续挂起以监听网络端口。也就是说这之后的代码都执行不了了，除非进程被信号终止
     #此时你还会发现 http://127.0.0.1:8000/docs 、 http://127.0.0.1:8000/redoc 可以打开。这是FastAPI框架自带的自动生成交互式API文档功能
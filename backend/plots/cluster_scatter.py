@@ -1,4 +1,8 @@
+import functools
+import hashlib
 import inspect
+import os
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
@@ -6,10 +10,32 @@ import matplotlib.pyplot as plt
 from sklearn.decomposition import PCA
 from sklearn.manifold import TSNE
 
-import umap
 import seaborn as sns
 
-from .base import CANAKO_TSNE_RANDOM_STATE, PALETTE, configure_matplotlib, empty_figure, figure_to_svg
+try:
+    from openTSNE import TSNE as OpenTSNE
+except ImportError:
+    OpenTSNE = None
+
+from .base import CANAKO_TSNE_RANDOM_STATE, PALETTE, configure_matplotlib, empty_figure, figure_to_bytes, figure_to_svg
+
+
+# 2-D coordinates are cached next to cluster_result.parquet and removed with the session.
+COORDS_CACHE_DIR = "scatter_cache"
+# Exact t-SNE is O(N^2) per iteration. Larger inputs use FFT-accelerated openTSNE
+# (or sklearn's Barnes-Hut when openTSNE is not installed).
+TSNE_EXACT_MAX_SAMPLES = 2000
+
+# umap-learn pulls in pynndescent, whose numba-compiled distance functions make `import umap`
+# take several seconds. It is imported on the first UMAP request instead of at server start.
+# A failed import is cached as well, so requests without umap-learn don't rescan sys.path each time.
+@functools.cache
+def _get_umap():
+    try:
+        import umap
+    except ImportError:
+        return None
+    return umap
 
 
 def _scatter_palette(n_colors: int):
@@ -33,6 +59,27 @@ def _tsne_kwargs(n_samples: int) -> dict:
     return kwargs
 
 
+def _large_tsne(embeddings: np.ndarray) -> np.ndarray:
+    n_samples = embeddings.shape[0]
+    if OpenTSNE is None:
+        # n_jobs only affects Barnes-Hut's neighbour search; the exact method ignores it.
+        return TSNE(**{**_tsne_kwargs(n_samples), "method": "barnes_hut", "n_jobs": -1}).fit_transform(embeddings)
+    # Same perplexity / exaggeration / iteration budget as the exact run: 250 early-exaggeration + 750 regular iterations.
+    return np.asarray(
+        OpenTSNE(
+            n_components=2,
+            perplexity=min(50, n_samples - 1),
+            early_exaggeration=50,
+            early_exaggeration_iter=250,
+            n_iter=750,
+            initialization="random",
+            negative_gradient_method="fft",
+            n_jobs=-1,
+            random_state=CANAKO_TSNE_RANDOM_STATE,
+        ).fit(embeddings)
+    )
+
+
 def _coords(embeddings: np.ndarray, reduction: str, random_state: int | None) -> np.ndarray:
     n_samples = embeddings.shape[0]
     if n_samples == 0:
@@ -50,13 +97,37 @@ def _coords(embeddings: np.ndarray, reduction: str, random_state: int | None) ->
     if reduction == "t-SNE":
         if n_samples < 4:
             return _coords(embeddings, "PCA", random_state)
+        if n_samples > TSNE_EXACT_MAX_SAMPLES:
+            return _large_tsne(embeddings)
         return TSNE(**_tsne_kwargs(n_samples)).fit_transform(embeddings)
 
+    umap = _get_umap()
     if umap is None:
-        return _coords(embeddings, "PCA", random_state)
+        raise RuntimeError("UMAP requires the umap-learn package, which is not installed on the server.")
     return umap.UMAP(n_components=2, random_state=random_state).fit_transform(embeddings)
 
 
+def _cached_coords(cache_dir: Path, embeddings: np.ndarray, reduction: str, random_state: int | None) -> np.ndarray:
+    # The projection depends only on the feature matrix, not on the labels, so re-running clustering
+    # with another K on the same data reuses the t-SNE / UMAP layout. Unseeded runs are not reproducible.
+    if random_state is None:
+        return _coords(embeddings, reduction, random_state)
+
+    digest = hashlib.blake2b(embeddings.tobytes(), digest_size=16)
+    digest.update(f"|{embeddings.shape}|{reduction}|{random_state}".encode())
+    cache_path = cache_dir / f"{digest.hexdigest()}.npy"
+    if cache_path.exists():
+        return np.load(cache_path)
+
+    coords = _coords(embeddings, reduction, random_state)
+    cache_dir.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, coords)
+    os.replace(tmp_path, cache_path)  # atomic, so concurrent workers never read a half-written file
+    return coords
+
+
 def build_figure(cluster_result_path: str, reduction: str = "PCA", random_state: int | None = 42) -> plt.Figure:
     df = pd.read_parquet(cluster_result_path)
     if df.empty:
@@ -67,8 +138,9 @@ def build_figure(cluster_result_path: str, reduction: str = "PCA", random_state:
         return empty_figure("No feature matrix columns found in cluster_result.parquet.", "Cluster Scatter")
 
     labels = df["label"].to_numpy()
-    embeddings = df[emb_cols].to_numpy(dtype=float)
-    coords = _coords(embeddings, reduction, random_state)
+    # One contiguous float32 matrix feeds PCA / t-SNE / UMAP: half the memory traffic of float64, no per-call copies.
+    embeddings = np.ascontiguousarray(df[emb_cols].to_numpy(dtype=np.float32))
+    coords = _cached_coords(Path(cluster_result_path).parent / COORDS_CACHE_DIR, embeddings, reduction, random_state)
 
     configure_matplotlib()
     fig, ax = plt.subplots(figsize=(12, 10))
@@ -114,3 +186,7 @@ def build_figure(cluster_result_path: str, reduction: str = "PCA", random_state:
 
 def render_svg(cluster_result_path: str, reduction: str = "PCA", random_state: int | None = 42) -> str:
     return figure_to_svg(build_figure(cluster_result_path, reduction, random_state))
+
+
+def render_bytes(cluster_result_path: str, file_format: str, reduction: str = "PCA", random_state: int | None = 42) -> bytes:
+    return figure_to_bytes(build_figure(cluster_result_path, reduction, random_state), file_format)
@@ -15,17 +15,20 @@ def build_figure(survival_data_path: str, p_value: float | None = None) -> plt.F
     fig, ax = plt.subplots(figsize=(9, 6))
     kmf = KaplanMeierFitter()
 
-    for index, cluster_id in enumerate(sorted(df["Cluster"].unique())):
-        subset = df[df["Cluster"] == cluster_id]
-        if subset.empty:
-            continue
+    # groupby finds every cluster's rows in one pass instead of one boolean mask per cluster.
+    for index, (cluster_id, subset) in enumerate(df.groupby("Cluster", sort=True)):
         color = PALETTE[index % len(PALETTE)]
         kmf.fit(subset["OS.time"], event_observed=subset["OS"], label=f"Cluster {cluster_id}")
         kmf.plot(ax=ax, ci_show=False, color=color, linewidth=2.5, show_censors=False)
 
         censored = subset[subset["OS"] == 0]
         if not censored.empty:
-            probs = kmf.survival_function_at_times(censored["OS.time"]).to_numpy()
+            # The KM estimate is a right-continuous step function over a sorted timeline, so one searchsorted
+            # finds the step for every censored time at once.
+            timeline = kmf.survival_function_.index.to_numpy()
+            estimate = kmf.survival_function_.iloc[:, 0].to_numpy()
+            steps = np.searchsorted(timeline, censored["OS.time"].to_numpy(), side="right") - 1
+            probs = estimate[np.clip(steps, 0, len(estimate) - 1)]
             ax.scatter(
                 censored["OS.time"],
                 probs,
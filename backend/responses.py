@@ -0,0 +1,48 @@
+# =============================================================================
+# JSON 响应类
+# =============================================================================
+
+"""
+基于 orjson 的 JSON 响应类
+
+FastAPI 默认的 JSONResponse 使用标准库 json 做序列化，遇到很长的 labels 列表、
+SVG 字符串等大响应体时，编码本身会成为接口耗时的主要部分。orjson 是 Rust 实现的
+JSON 库，编码速度快得多，并且可以直接序列化 numpy 数组。
+
+FastAPI 自带的 fastapi.responses.ORJSONResponse 在新版本中已被标记为弃用，
+所以这里自己实现一个，行为与之保持一致。
+"""
+
+import time
+import datetime
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 序列化响应体的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        # OPT_NON_STR_KEYS：允许 int 等非字符串类型作为字典键（比如 cluster_counts 的簇编号）
+        # OPT_SERIALIZE_NUMPY：直接序列化 numpy 数组和 numpy 标量
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# 最近一次格式化的 (整秒时间戳, ISO 字符串)
+_server_time_cache: tuple[int, str] = (0, "")
+
+
+def now_iso() -> str:
+    """
+    返回当前时间的 ISO 8601 字符串，用作响应里的 server_time 字段
+
+    server_time 只用来在日志里对照请求时间，秒级精度就足够了。同一秒内的请求直接复用
+    上一次格式化好的字符串，省掉每次 datetime.now() 和 isoformat() 的对象分配与格式化开销。
+    """
+    global _server_time_cache
+    second = int(time.time())
+    if second != _server_time_cache[0]:
+        _server_time_cache = (second, datetime.datetime.fromtimestamp(second).isoformat())
+    return _server_time_cache[1]
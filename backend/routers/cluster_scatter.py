@@ -5,10 +5,13 @@ PCA、t-SNE 或 UMAP 等方法降到二维，并返回前端可以显示的 SVG
 不负责重新运行聚类算法。
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from plots.base import CLUSTER_RESULT_FILE, empty_svg, plot_path
+from executors import get_process_pool
 from plots.cluster_scatter import render_svg as render_cluster_scatter_svg
 
 
@@ -32,7 +35,16 @@ async def cluster_scatter(request: ClusterScatterRequest):
         if not path.exists():
             raise FileNotFoundError("cluster_result.parquet not found. Please run clustering first.")
 
-        svg = render_cluster_scatter_svg(str(path), request.reduction, _seed_or_none(request.random_state))
+        # t-SNE / UMAP are CPU-bound and can take many seconds; run them in the clustering process pool
+        # so the event loop keeps serving other requests meanwhile.
+        loop = asyncio.get_running_loop()
+        svg = await loop.run_in_executor(
+            get_process_pool(),
+            render_cluster_scatter_svg,
+            str(path),
+            request.reduction,
+            _seed_or_none(request.random_state),
+        )
         return {"status": "success", "svg": svg, "reduction": request.reduction}
     except FileNotFoundError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -108,7 +108,7 @@ def _load_cluster_info(session_id: str) -> pd.DataFrame:
     cluster_path = plot_path(session_id, CLUSTER_RESULT_FILE)
     if not cluster_path.exists():
         raise FileNotFoundError("cluster_result.parquet not found. Please run clustering first.")
-    cluster_df = pd.read_parquet(cluster_path)[["sample_name", "label"]].copy()
+    cluster_df = pd.read_parquet(cluster_path, columns=["sample_name", "label"])
     cluster_df["sample_name"] = cluster_df["sample_name"].astype(str)
     cluster_df = cluster_df.rename(columns={"label": "Cluster"}).set_index("sample_name")
     return cluster_df
@@ -5,7 +5,6 @@
 相关指标，并把生存分析需要的 p 值写入 survival_meta.json，供 survival.py 和 plots.py 使用。
 """
 
-import datetime
 import json
 import subprocess
 from pathlib import Path
@@ -18,6 +17,7 @@ from pydantic import BaseModel
 from metrics.awa_metrics import compute_awa_metrics
 from plots.base import CLUSTER_RESULT_FILE, enrichment_file, plot_path, write_json
 from routers.upload import CLINICAL_DATA_FILE, load_frame_dict
+from responses import now_iso
 
 
 router = APIRouter()
@@ -107,7 +107,7 @@ def build_clinical_metrics_input(session_id: str) -> tuple[Path, int, int]:
     if rename_map:
         clinical_df = clinical_df.rename(columns=rename_map)
 
-    cluster_df = pd.read_parquet(cluster_path)[["sample_name", "label"]].copy()
+    cluster_df = pd.read_parquet(cluster_path, columns=["sample_name", "label"])
     cluster_df["sample_name"] = cluster_df["sample_name"].astype(str)
     cluster_df = cluster_df.rename(columns={"label": "Cluster"}).set_index("sample_name")
 
@@ -177,7 +177,7 @@ async def cluster_metrics(request: MetricsRequest):
         return {
             "status": "success",
             "message": "Cluster metrics calculated.",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
                 "method": "Clustering",
                 "metrics": metrics_scores,
@@ -203,7 +203,7 @@ async def clinical_metrics(request: MetricsRequest):
         return {
             "status": "success",
             "message": "Clinical metrics calculated.",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
                 "method": "Clinical",
                 "clinical_metrics": clinical_metrics_scores,
@@ -228,7 +228,7 @@ async def biology_metrics(request: BiologyMetricsRequest):
         return {
             "status": "success",
             "message": "Biology mechanism metrics calculated.",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
                 "method": "Biology",
                 "biology_metrics": biology_metrics_scores,
@@ -277,7 +277,7 @@ async def awa_metrics(request: AwaMetricsRequest):
         return {
             "status": "success",
             "message": "AWA metrics calculated.",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
                 "method": "AWA",
                 "awa_metrics": awa_metrics_scores,
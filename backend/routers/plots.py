@@ -5,6 +5,7 @@ cluster_result.parquet、differential_volcano.parquet、survival 数据和 enric
 它把这些结果渲染成 SVG，或导出为前端下载所需的图片文件格式。
 """
 
+import asyncio
 import io
 import re
 
@@ -28,7 +29,8 @@ from plots.base import (
     run_r_svg,
     session_dir,
 )
-from plots.cluster_scatter import build_figure as build_cluster_scatter_figure
+from executors import get_process_pool
+from plots.cluster_scatter import render_bytes as render_cluster_scatter_bytes
 from plots.differential_volcano import build_figure as build_volcano_figure
 from plots.differential_volcano import render_svg as render_volcano_svg
 from plots.parameter_surface import build_figure as build_parameter_figure
@@ -107,15 +109,26 @@ def _download_filename(stem: str, file_format: str) -> str:
     return f"{safe_stem}.{file_format.lower()}"
 
 
+async def _render_cluster_scatter_download(request: PlotDownloadRequest, file_format: str) -> tuple[bytes, str]:
+    # Same as /api/plots/cluster_scatter: t-SNE / UMAP take seconds, so render in the process pool
+    # instead of blocking the event loop.
+    path = plot_path(request.session_id, CLUSTER_RESULT_FILE)
+    loop = asyncio.get_running_loop()
+    payload = await loop.run_in_executor(
+        get_process_pool(),
+        render_cluster_scatter_bytes,
+        str(path),
+        file_format,
+        request.reduction,
+        _seed_or_none(request.random_state),
+    )
+    return payload, f"cluster_scatter_{request.reduction}"
+
+
 def _render_download_payload(request: PlotDownloadRequest) -> tuple[bytes, str]:
     plot_type = request.plot_type.strip().lower()
     file_format = request.format.strip().lower()
 
-    if plot_type == "cluster_scatter":
-        path = plot_path(request.session_id, CLUSTER_RESULT_FILE)
-        fig = build_cluster_scatter_figure(str(path), request.reduction, _seed_or_none(request.random_state))
-        return figure_to_bytes(fig, file_format), f"cluster_scatter_{request.reduction}"
-
     if plot_type == "differential_volcano":
         cluster_id = _require_cluster_id(request)
         path = plot_path(request.session_id, DIFFERENTIAL_VOLCANO_FILE)
@@ -219,7 +232,10 @@ async def parameter_surface(request: ParameterPlotRequest):
 async def download_plot(request: PlotDownloadRequest):
     try:
         file_format = request.format.strip().lower()
-        payload, filename_stem = _render_download_payload(request)
+        if request.plot_type.strip().lower() == "cluster_scatter":
+            payload, filename_stem = await _render_cluster_scatter_download(request, file_format)
+        else:
+            payload, filename_stem = _render_download_payload(request)
         filename = _download_filename(filename_stem, file_format)
         headers = {
             "Content-Disposition": f'attachment; filename="{filename}"',
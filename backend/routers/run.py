@@ -6,14 +6,20 @@
 """
 
 import os
-import datetime
+import asyncio
+import hashlib
+import shutil
+import msgspec
 import pandas as pd
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form
+import pyarrow.parquet as pq
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Request
 from pydantic import BaseModel
 from algorithms import load_algorithm
-from routers.upload import OMICS_DATA_FILE, CLINICAL_DATA_FILE, load_frame_dict
-import shutil
+from routers.upload import OMICS_DATA_FILE, CLINICAL_DATA_FILE, load_frame_dict, read_uploaded_dataframe, save_upload_file
 from cleanup import cleanup_temp_files
+from executors import get_process_pool
+from logger import logger
+from responses import ORJSONResponse, now_iso
 import itertools
 import numpy as np
 import pandas as pd
@@ -24,9 +30,10 @@ from plots.parameter_surface import render_svg as render_parameter_svg
 # 创建路由器实例
 router=APIRouter()
 
-class AnalysisRequest(BaseModel): #定义数据校验模型 #定义一个类，在这个类里声明几个变量，并且明确指定这几个变量的类型。以此实现确保输入数据类型符合该要求，如果不符合，FastAPI会自动拦截并返回422错误
+class AnalysisRequest(msgspec.Struct): #定义数据校验模型 #定义一个类，在这个类里声明几个变量，并且明确指定这几个变量的类型。以此实现确保输入数据类型符合该要求，如果不符合，run_analysis会返回422错误
     #这里的冒号使用的是Python的类型提示语法。 变量名: 类型 意思是声明一个名为 变量名 的变量，它的预期类型是 类型 
-    #虽然在普通Python代码中类型提示通常只是像注释一样给人看的，但在pydantic.BaseModel中，冒号具有强制性，Pydantic库会读取冒号后面的类型，并像C语言那样执行强制类型转换和验证
+    #虽然在普通Python代码中类型提示通常只是像注释一样给人看的，但msgspec.json.decode解码时会读取冒号后面的类型，并像C语言那样执行强制类型转换和验证
+    #这里用msgspec.Struct而不是pydantic.BaseModel：对这种字段固定的小请求体，msgspec解码+校验一步完成，比pydantic快得多
     algorithm: str #用户选择的算法名称
     timestamp: str #请求发起时的时间戳
     session_id: str # 【修改】将 filename 改为 session_id
@@ -38,11 +45,111 @@ class AnalysisRequest(BaseModel): #定义数据校验模型 #定义一个类，
     max_iter: int=300 #最大迭代次数，默认300，用于防止算法在无法收敛时陷入死循环
     # 【新增】谱聚类的核心参数：邻居数
     n_neighbors: int=10
+    #MiniBatchKMeans每批的样本数，-1表示根据样本量自动选择（见algorithms/kmeans.py）
+    batch_size: int=-1
     #用户选择的降维算法
     # reduction: str="PCA" #用户选择的降维算法，默认PCA
 
-@router.post("/api/run")
-async def run_analysis(request:AnalysisRequest): #指定record的类型为AnalysisRequest，就是我们刚才定义的那个类，如果前端传来的数据类型不匹配，FastAPI会自动拦截并返回422错误
+    @classmethod
+    def from_trusted(cls, data: dict) -> "AnalysisRequest":
+        """从可信来源（比如后端内部重试、任务队列里我们自己写进去的数据）构造请求对象
+
+        msgspec.Struct 的构造函数本来就不做类型转换和校验，缺省的字段照样会用默认值补上。
+        注意：前端发来的 HTTP 请求体是不可信的，必须继续用 msgspec.json.decode 按类型解码校验，不能用这个方法。
+        """
+        return cls(**data)
+
+# 固定随机种子的运行结果缓存在会话目录下的这个子目录里，会话被清理时缓存也一起删掉
+RUN_CACHE_DIR = "run_cache"
+# 每个会话最多保留多少份缓存结果（每份都是一整个特征矩阵），超出时删掉最久没用过的
+RUN_CACHE_MAX_ENTRIES = 16
+
+def _result_cache_key(request: AnalysisRequest, seed: int | None, file_path: str) -> str | None:
+    """根据 (组学数据文件, 算法, 参数) 计算结果缓存的键
+
+    文件的 mtime 和大小也算进键里，用户重新上传数据后旧的缓存自然失效。
+    随机种子为 -1（seed 为 None）时每次运行结果都不一样，不缓存，返回 None。
+    """
+    if seed is None:
+        return None
+    stat = os.stat(file_path)
+    raw = "|".join(str(v) for v in (
+        request.session_id, stat.st_mtime_ns, stat.st_size,
+        request.algorithm, request.n_clusters, seed, request.max_iter, request.n_neighbors, request.batch_size,
+    ))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _prune_run_cache(cache_dir: str) -> None:
+    """只保留最近用过的 RUN_CACHE_MAX_ENTRIES 份缓存结果，不然每换一个种子或 K 值就多存一整个特征矩阵，直到会话过期才删"""
+    entries = sorted(os.scandir(cache_dir), key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in entries[RUN_CACHE_MAX_ENTRIES:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError: #别的请求刚好也在清理
+            pass
+
+def _run_clustering(request: AnalysisRequest, seed: int | None, file_path: str, cache_key: str | None) -> tuple[np.ndarray, int, str]:
+    """在进程池中执行的聚类主体：读取组学数据、运行算法，并把结果持久化到 cluster_result.parquet
+
+    返回 (labels, n_features, method)，method 是实际运行的算法（含实现变体）。命中结果缓存时跳过计算，直接把缓存的结果拷回 cluster_result.parquet，
+    保证后续的指标/绘图接口读到的一定是这次请求对应的结果。
+    """
+    result_path = os.path.join("upload", request.session_id, "cluster_result.parquet")
+    cache_path = os.path.join("upload", request.session_id, RUN_CACHE_DIR, f"{cache_key}.parquet") if cache_key else None
+    if cache_path and os.path.exists(cache_path):
+        os.utime(cache_path) #刷新修改时间，标记为最近用过，清理旧缓存时留下它
+        shutil.copyfile(cache_path, result_path)
+        #只读 label 一列，特征数从 parquet 的 schema 里数出来，不用把整个特征矩阵读进内存
+        df_result = pd.read_parquet(result_path, columns=["label"])
+        n_features = len(pq.read_schema(result_path).names) - 2 #减去 sample_name 和 label 两列
+        return df_result["label"].to_numpy(), n_features, df_result.attrs.get("method", request.algorithm)
+
+    data_dict = load_frame_dict(file_path)
+
+    # 动态加载算法，并传入所有的参数实例化
+    algo_class = load_algorithm(request.algorithm)
+    algo_instance = algo_class(
+        n_clusters=request.n_clusters,
+        random_state=seed,
+        max_iter=request.max_iter,
+        n_neighbors=request.n_neighbors,
+        batch_size=request.batch_size,
+        omics_path=file_path,
+    )
+
+    # 运行算法，获取聚类结果
+    # fit_predict 返回：
+    #   labels       — 形状 (n_samples,) 的 numpy 数组，每个样本的簇标签
+    #   embeddings   — 形状 (n_samples, n_features) 的 numpy 数组，用于后续评估和降维
+    #   sample_names — 长度 n_samples 的列表，样本名称
+    labels, embeddings, sample_names = algo_instance.fit_predict(data_dict)
+    # 算法可能根据数据规模换用别的实现（比如大样本量时的 MiniBatchKMeans），在 method 里标出来
+    method = request.algorithm if algo_instance.variant is None else f"{request.algorithm} ({algo_instance.variant})"
+
+    # 将中间结果持久化到 cluster_result.parquet，供 /api/metrics 和 /api/plots/cluster_scatter 读取
+    n_features = embeddings.shape[1]
+    df_result = pd.DataFrame(
+        embeddings,
+        columns=[f"emb_{i}" for i in range(n_features)]
+    )
+    df_result.insert(0, "sample_name", sample_names)
+    df_result.insert(1, "label", labels)
+    df_result.attrs["method"] = method #attrs 会随 parquet 一起保存，命中结果缓存时也能还原出 method
+    df_result.to_parquet(result_path, index=False)
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        shutil.copyfile(result_path, cache_path)
+        _prune_run_cache(os.path.dirname(cache_path))
+    return np.asarray(labels), n_features, method
+
+@router.post("/api/run", response_model=None) #response_model=None：不让FastAPI再对返回值做一遍响应模型校验
+async def run_analysis(http_request:Request): #直接拿原始请求，请求体由我们自己用msgspec解码成AnalysisRequest，不再经过FastAPI/pydantic的依赖注入和校验
+    try:
+        #strict=False：和pydantic一样允许"3"这种字符串形式的数字。如果前端传来的数据类型不匹配，返回422错误
+        request=msgspec.json.decode(await http_request.body(), type=AnalysisRequest, strict=False)
+    except msgspec.DecodeError as e: #ValidationError是DecodeError的子类，JSON格式错误和字段类型错误都在这里处理
+        raise HTTPException(status_code=422, detail=str(e))
+
     # print(f"\n[后端日志] 收到分析请求:") #在控制台打印日志（实际生产环境中建议使用logging模块替代print）
     # print(f"   - 用户选择的算法名称: {request.algorithm}")
     # print(f"   - 时间戳: {request.timestamp}")
@@ -50,14 +157,9 @@ async def run_analysis(request:AnalysisRequest): #指定record的类型为Analys
     # print(f"   - 用户选择的降维算法: {request.reduction}")
     # print(f"   - 参数: K={request.n_clusters}, Seed={request.random_state}, Iter={request.max_iter}")
 
-    #设置全局随机种子。虽然下面这几句代码是写在函数里的，但它们生效的范围是全局。所以虽然在当前开发阶段这么写是完全可取的，但如果我以后要构建一个高并发的商业级服务器，这么写就不可取了
+    #随机种子不再在这里全局设置，而是作为random_state参数传给算法，由各个算法自己交给sklearn等库（个别只能用全局种子的库，比如parea.py里的pyrea，在进程池的子进程里自己设置）
+    #现有算法都不用torch，所以这里也不做torch.manual_seed/torch.cuda.manual_seed_all：那样每个请求都要初始化CUDA上下文、给每张GPU各发一次调用。以后接入需要torch的算法时，在那个算法的fit_predict里设置
     seed=request.random_state if request.random_state!=-1 else None #如果用户传的是-1，变量设为None；否则设为用户传来的整数
-    # random.seed(seed) # 设置Python原生random库的种子
-    # np.random.seed(seed) #设置NumPy的随机种子
-    # seed_for_torch=request.random_state if request.random_state!=-1 else random.randint(0,2**32-1) #pytorch比较特殊，不能直接把None作为种子，所以我们随机生成一个整数作为种子
-    # torch.manual_seed(seed_for_torch) #设置CPU生成随机数的种子
-    # torch.cuda.manual_seed(seed_for_torch) #为当前GPU设置随机种子
-    # torch.cuda.manual_seed_all(seed_for_torch) #为所有GPU设置随机种子
 
     # mock_result_data={} #初始化结果字典，这个就是函数要返回的东西之一
 
@@ -76,52 +178,31 @@ async def run_analysis(request:AnalysisRequest): #指定record的类型为Analys
         if not os.path.exists(file_path): #检查该路径是否存在
             # raise FileNotFoundError(f"找不到文件: {request.filename}")
             raise FileNotFoundError(f"找不到组学数据文件，请先上传数据")
-        data_dict = load_frame_dict(file_path)
 
-        # 2. 动态加载算法，并传入所有的参数实例化
-        algo_class = load_algorithm(request.algorithm)
-        algo_instance = algo_class(
-            n_clusters=request.n_clusters,
-            random_state=seed,
-            max_iter=request.max_iter,
-            n_neighbors=request.n_neighbors,
-            omics_path=file_path,
-        )
-
-        # 3. 运行算法，获取聚类结果
-        # fit_predict 返回：
-        #   labels       — 形状 (n_samples,) 的 numpy 数组，每个样本的簇标签
-        #   embeddings   — 形状 (n_samples, n_features) 的 numpy 数组，用于后续评估和降维
-        #   sample_names — 长度 n_samples 的列表，样本名称
-        labels, embeddings, sample_names = algo_instance.fit_predict(data_dict)
-
-        # 4. 将中间结果持久化到 cluster_result.parquet，供 /api/metrics 和 /api/plots/cluster_scatter 读取
-        n_features = embeddings.shape[1]
-        df_result = pd.DataFrame(
-            embeddings,
-            columns=[f"emb_{i}" for i in range(n_features)]
-        )
-        df_result.insert(0, "sample_name", sample_names)
-        df_result.insert(1, "label", labels)
-        result_path = os.path.join("upload", request.session_id, "cluster_result.parquet")
-        df_result.to_parquet(result_path, index=False)
+        # 2~4. 读数据、训练模型、保存结果都是阻塞的CPU/磁盘操作，直接写在async函数里会卡住整个事件循环，让其他用户的请求全部排队
+        # 所以把它们丢到进程池里执行，await期间事件循环可以继续处理其他请求。用进程而不是线程，是为了不和服务器的其他请求争抢GIL
+        # 同一份数据、同一组参数、固定随机种子的结果是确定的，用 (文件, 算法, 参数) 的哈希做缓存键，命中时跳过计算
+        cache_key = _result_cache_key(request, seed, file_path)
+        loop = asyncio.get_running_loop()
+        labels, n_features, method = await loop.run_in_executor(get_process_pool(), _run_clustering, request, seed, file_path, cache_key)
 
         # 5. 返回基础聚类信息（不含指标和散点图，由独立指标/绘图接口负责）
-        return {
+        # 直接返回 ORJSONResponse 实例，FastAPI 就不会再用 jsonable_encoder 把整个字典逐个对象遍历一遍，而是直接交给 orjson 编码
+        return ORJSONResponse(content={
             "status": "success",
             "message": f"算法 {request.algorithm} 运行成功，请调用 /api/metrics 获取指标，并调用 /api/plots/cluster_scatter 获取散点图",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
-                "method": request.algorithm,
-                "n_samples": len(sample_names),
-                "n_features": int(embeddings.shape[1]),
-                "labels": labels.tolist(),
-                "cluster_counts": {int(k): int(v) for k, v in pd.Series(labels).value_counts().items()},
+                "method": method,
+                "n_samples": len(labels),
+                "n_features": int(n_features),
+                "labels": np.ascontiguousarray(labels), #直接把numpy数组交给orjson（OPT_SERIALIZE_NUMPY）从底层缓冲区编码，不用先.tolist()装箱成N个Python int
+                "cluster_counts": dict(zip(*(a.tolist() for a in np.unique(labels, return_counts=True)))), #和 /api/evaluate_custom 一样用 np.unique 一次统计各簇样本数：不用包装成pandas Series，也不怕算法给出负数标签（np.bincount遇到负数会报错）
             }
-        }
+        })
 
     except Exception as e:
-        print(f"[算法错误] {str(e)}")
+        logger.error(f"[算法错误] {str(e)}")
         raise HTTPException(status_code=400, detail=f"算法运行失败: {str(e)}")
 
 
@@ -133,12 +214,84 @@ async def run_analysis(request:AnalysisRequest): #指定record的类型为Analys
 cluster_result.parquet。这样 metrics.py、cluster_scatter.py 等后续接口可以继续使用。
 """
 
-@router.post("/api/evaluate_custom")
+def _evaluate_custom_file(file_location: str, upload_path: str) -> tuple[np.ndarray, int, int]:
+    """解析用户上传的自定义聚类结果，与已上传的数据取交集后保存成 cluster_result.parquet
+
+    返回 (labels, n_features, lost_samples)。解析和读写 parquet 都是阻塞操作，由 evaluate_custom 放进线程里执行。
+    """
+    # 2. 解析文件（首列为样本名索引，次列为聚类标签，其余列为特征矩阵）
+    #和 /api/upload 共用同一个读取函数（有表头行、有索引列）：先嗅探分隔符，再用多线程的 pyarrow 解析，失败时依次退回 C 引擎、Python 引擎和 read_excel
+    #带着整个特征矩阵的结果文件可能很宽，pyarrow 比默认的 C 引擎快得多
+    try:
+        df = read_uploaded_dataframe(file_location, "row_sample_yes_yes", os.path.basename(file_location))
+    except ValueError as e:
+        raise ValueError(f"结果文件解析失败，请确保格式正确: {str(e)}")
+
+    if df.shape[1] < 2:
+        raise ValueError(
+            "结果数据格式不符：除样本名称（索引列）外，"
+            "至少应包含一列聚类标签和一列特征数据。"
+        )
+
+    sample_names = df.index.astype(str).tolist()
+
+    # 3. 与已上传的组学/临床数据取交集，过滤无效样本
+    valid_samples = set(sample_names)
+
+    omics_path = os.path.join(upload_path, OMICS_DATA_FILE)
+    if os.path.exists(omics_path):
+        omics_dict = load_frame_dict(omics_path)
+        omics_samples = set()
+        for o_df in omics_dict.values():
+            if not omics_samples:
+                omics_samples = set(o_df.index.astype(str))
+            else:
+                omics_samples &= set(o_df.index.astype(str))
+        valid_samples &= omics_samples
+
+    clinical_path = os.path.join(upload_path, CLINICAL_DATA_FILE)
+    if os.path.exists(clinical_path):
+        clinical_dict = load_frame_dict(clinical_path)
+        clinical_df = list(clinical_dict.values())[0]
+        valid_samples &= set(clinical_df.index.astype(str))
+
+    lost_samples = len(sample_names) - len(valid_samples)
+    if len(valid_samples) == 0:
+        raise ValueError(
+            "交集校验失败！结果数据中的病人在您上传的组学或临床数据中均未找到匹配。"
+        )
+
+    # 4. 过滤后提取标签和特征矩阵
+    df_filtered = df[df.index.astype(str).isin(valid_samples)]
+    filtered_sample_names = df_filtered.index.astype(str).tolist()
+    try:
+        label_values = pd.to_numeric(df_filtered.iloc[:, 0], errors="raise").to_numpy(dtype=np.float64)
+    except (ValueError, TypeError):
+        raise ValueError("结果文件第一列必须是整数聚类标签，发现了非数字的标签。")
+    # 空标签会变成 NaN，直接 astype 会被悄悄转成一个极小的负数标签，所以先检查是否都是有限的整数
+    if not (np.isfinite(label_values).all() and (label_values == np.floor(label_values)).all()):
+        raise ValueError("结果文件第一列必须是整数聚类标签，发现了空值或非整数的标签。")
+    labels = label_values.astype(np.int64) #整列一次性在 C 层转成整数标签，不用逐个样本 int()
+    embeddings = df_filtered.iloc[:, 1:].values
+
+    # 5. 持久化中间结果，供 /api/metrics 和 /api/plots/cluster_scatter 读取（Parquet 格式）
+    n_features = embeddings.shape[1]
+    df_result = pd.DataFrame(
+        embeddings,
+        columns=[f"emb_{i}" for i in range(n_features)]
+    )
+    df_result.insert(0, "sample_name", filtered_sample_names)
+    df_result.insert(1, "label", labels)
+    result_path = os.path.join(upload_path, "cluster_result.parquet")
+    df_result.to_parquet(result_path, index=False)
+    return labels, n_features, lost_samples
+
+@router.post("/api/evaluate_custom", response_model=None)
 async def evaluate_custom(
     file: UploadFile = File(...),
     session_id: str = Form(...),
 ):
-    print(f"\n[后端日志] 收到自定义结果评估请求，会话ID：{session_id}")
+    logger.info(f"[后端日志] 收到自定义结果评估请求，会话ID：{session_id}")
     temp_paths = []
     try:
         UPLOAD_PATH = os.path.join("upload", session_id)
@@ -148,90 +301,33 @@ async def evaluate_custom(
         # 1. 保存上传的结果文件（临时）
         file_location = os.path.join(UPLOAD_PATH, file.filename)
         temp_paths.append(file_location)
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload_file(file, file_location)
 
-        # 2. 解析文件（首列为样本名索引，次列为聚类标签，其余列为特征矩阵）
-        try:
-            df = pd.read_csv(file_location, index_col=0, header=0)
-        except Exception:
-            try:
-                df = pd.read_excel(file_location, index_col=0, header=0)
-            except Exception as e:
-                raise ValueError(f"结果文件解析失败，请确保格式正确: {str(e)}")
-
-        if df.shape[1] < 2:
-            raise ValueError(
-                "结果数据格式不符：除样本名称（索引列）外，"
-                "至少应包含一列聚类标签和一列特征数据。"
-            )
-
-        sample_names = df.index.astype(str).tolist()
-
-        # 3. 与已上传的组学/临床数据取交集，过滤无效样本
-        valid_samples = set(sample_names)
-
-        omics_path = os.path.join(UPLOAD_PATH, OMICS_DATA_FILE)
-        if os.path.exists(omics_path):
-            omics_dict = load_frame_dict(omics_path)
-            omics_samples = set()
-            for o_df in omics_dict.values():
-                if not omics_samples:
-                    omics_samples = set(o_df.index.astype(str))
-                else:
-                    omics_samples &= set(o_df.index.astype(str))
-            valid_samples &= omics_samples
-
-        clinical_path = os.path.join(UPLOAD_PATH, CLINICAL_DATA_FILE)
-        if os.path.exists(clinical_path):
-            clinical_dict = load_frame_dict(clinical_path)
-            clinical_df = list(clinical_dict.values())[0]
-            valid_samples &= set(clinical_df.index.astype(str))
-
-        lost_samples = len(sample_names) - len(valid_samples)
-        if len(valid_samples) == 0:
-            raise ValueError(
-                "交集校验失败！结果数据中的病人在您上传的组学或临床数据中均未找到匹配。"
-            )
-
-        # 4. 过滤后提取标签和特征矩阵
-        df_filtered = df[df.index.astype(str).isin(valid_samples)]
-        filtered_sample_names = df_filtered.index.astype(str).tolist()
-        labels = df_filtered.iloc[:, 0].values
-        embeddings = df_filtered.iloc[:, 1:].values
-
-        # 5. 持久化中间结果，供 /api/metrics 和 /api/plots/cluster_scatter 读取（Parquet 格式）
-        n_features = embeddings.shape[1]
-        df_result = pd.DataFrame(
-            embeddings,
-            columns=[f"emb_{i}" for i in range(n_features)]
-        )
-        df_result.insert(0, "sample_name", filtered_sample_names)
-        df_result.insert(1, "label", labels)
-        result_path = os.path.join(UPLOAD_PATH, "cluster_result.parquet")
-        df_result.to_parquet(result_path, index=False)
+        # 2~5. 解析文件、取交集、保存结果都是阻塞的pandas/磁盘操作，放进线程里执行，不卡住事件循环
+        labels, n_features, lost_samples = await asyncio.to_thread(_evaluate_custom_file, file_location, UPLOAD_PATH)
 
         # 清理临时结果文件
         cleanup_temp_files(temp_paths)
 
         # 6. 返回基础聚类信息（不含指标和散点图，由独立指标/绘图接口负责）
-        return {
+        # 和 /api/run 一样直接返回 ORJSONResponse 实例，跳过 FastAPI 对返回值的 jsonable_encoder 遍历
+        return ORJSONResponse(content={
             "status": "success",
             "message": "自定义结果解析成功，请调用 /api/metrics 获取指标，并调用 /api/plots/cluster_scatter 获取散点图",
-            "server_time": datetime.datetime.now().isoformat(),
+            "server_time": now_iso(),
             "data": {
                 "method": "Custom Evaluation",
-                "n_samples": len(filtered_sample_names),
-                "n_features": int(embeddings.shape[1]),
-                "labels": [int(l) for l in labels],
-                "cluster_counts": {int(k): int(v) for k, v in pd.Series(labels).value_counts().items()},
+                "n_samples": len(labels),
+                "n_features": int(n_features),
+                "labels": labels, #和 /api/run 一样直接交给 orjson 从 numpy 缓冲区编码
+                "cluster_counts": dict(zip(*(a.tolist() for a in np.unique(labels, return_counts=True)))), #np.unique 一次排序统计各簇样本数，自定义标签可能是负数，不能用 np.bincount
                 "lost_samples": lost_samples,  # 因交集过滤而丢弃的样本数
             }
-        }
+        })
 
     except Exception as e:
         cleanup_temp_files(temp_paths)
-        print(f"[自定义评估错误] {str(e)}")
+        logger.error(f"[自定义评估错误] {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
@@ -38,7 +38,7 @@ async def run_survival_analysis(request: SurvivalRequest):
         clinical_df = list(clinical_dict.values())[0].copy()
         clinical_df.index = clinical_df.index.astype(str)
 
-        cluster_df = pd.read_parquet(cluster_path)[["sample_name", "label"]].copy()
+        cluster_df = pd.read_parquet(cluster_path, columns=["sample_name", "label"])
         cluster_df["sample_name"] = cluster_df["sample_name"].astype(str)
         cluster_df = cluster_df.rename(columns={"label": "Cluster"}).set_index("sample_name")
 
@@ -6,13 +6,23 @@
 """
 
 import os
+import io
+import csv
+import sys
+import asyncio
 import json
-import shutil
+import hashlib
+import functools
+import aiofiles
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pandas._libs.parsers import STR_NA_VALUES
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form
 from typing import List
 from cleanup import cleanup_temp_files
+from logger import logger
 from pathlib import Path
 from typing import Any
 
@@ -22,6 +32,18 @@ EXPRESSION_DATA_FILE = "expression_data.parquet"
 OMICS_META_FILE = "omics_data.json"
 CLINICAL_META_FILE = "clinical_data.json"
 EXPRESSION_META_FILE = "expression_data.json"
+# zstd 比 pandas 默认的 snappy 压得更小，宽组学矩阵的读取反而更快（要解压的字节更少）
+PARQUET_COMPRESSION = "zstd"
+
+CSV_SNIFF_BYTES = 64 * 1024  # 嗅探分隔符时读取的文件开头字节数
+CSV_SNIFF_LINES = 20  # 嗅探分隔符时使用的行数
+CSV_DELIMITERS = ",\t;|"  # 支持自动识别的分隔符
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 保存上传文件时每次读写的字节数（1 MiB）
+SPREADSHEET_MAGIC = (b"PK\x03\x04", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")  # xlsx（zip 压缩包）和老式 xls（OLE2）的文件头
+PYARROW_CSV_BLOCK_SIZE = 1 << 20  # pyarrow 每个线程一次解析的最少字节数（1 MiB）
+PYARROW_CSV_BLOCK_ROWS = 128  # 每块至少包含的行数：几万列的宽矩阵一行就有上百 KB，块太小时每块每列的固定开销会远远超过解析本身
+VALIDATION_BLOCK_COLUMNS = 2048  # 校验缺失值时每次转换成 float 数组的列数
+FRAME_CACHE_SIZE = 2  # 每个进程最多缓存多少份解析好的 parquet 输入数据。每个 Web worker 和每个进程池子进程都各有一份缓存，只留最近用过的（一般就是同一会话的组学数据和临床数据），不让常驻内存随进程数成倍增长
 
 
 def input_data_files(file_type: str) -> tuple[str, str]:
@@ -37,15 +59,18 @@ def _metadata_path(parquet_path: str | Path) -> Path:
     return path.with_suffix(".json")
 
 
-def save_frame_dict(data: dict[str, pd.DataFrame], parquet_path: str | Path, metadata_path: str | Path | None = None) -> None:
+def save_frame_dict(data: dict[str, pd.DataFrame], parquet_path: str | Path, metadata_path: str | Path | None = None, upload_info: dict[str, Any] | None = None) -> None:
+    """upload_info 会原样写进元数据 JSON（/api/upload 用它记录这份数据对应的上传文件摘要，见 _cached_upload）"""
     parquet_path = Path(parquet_path)
     metadata_path = Path(metadata_path) if metadata_path is not None else _metadata_path(parquet_path)
     parquet_path.parent.mkdir(parents=True, exist_ok=True)
 
     stored_frames: list[pd.DataFrame] = []
     metadata: dict[str, Any] = {"version": 1, "frames": []}
+    if upload_info is not None:
+        metadata["upload"] = upload_info
     for frame_index, (key, df) in enumerate(data.items()):
-        stored = df.copy()
+        stored = df.copy(deep=False)  # 只是换一套列名，浅拷贝就够了，不用把整张表的数据复制一遍
         columns = []
         for column_index, column_name in enumerate(stored.columns):
             storage_name = f"frame_{frame_index}__col_{column_index}"
@@ -54,17 +79,37 @@ def save_frame_dict(data: dict[str, pd.DataFrame], parquet_path: str | Path, met
         stored_frames.append(stored)
         metadata["frames"].append({"key": str(key), "columns": columns})
 
-    combined = pd.concat(stored_frames, axis=1, join="outer") if stored_frames else pd.DataFrame()
-    combined.index.name = combined.index.name or "sample_name"
-    combined.to_parquet(parquet_path, index=True)
+    if len(stored_frames) == 1:
+        combined = stored_frames[0]  # 只有一个组学（临床数据、表达矩阵都是这样）时不用再 concat 复制一遍
+    elif stored_frames:
+        combined = pd.concat(stored_frames, axis=1, join="outer")
+    else:
+        combined = pd.DataFrame()
+    combined.index = combined.index.rename(combined.index.name or "sample_name")  # 换一个新的 Index 对象，不改动调用方表格的索引名
+    combined.to_parquet(parquet_path, index=True, compression=PARQUET_COMPRESSION)
     metadata_path.write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+@functools.lru_cache(maxsize=FRAME_CACHE_SIZE)
+def _read_frame_files(parquet_path: Path, metadata_path: Path, parquet_stat: tuple[int, int], metadata_stat: tuple[int, int]) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """读取 parquet 和元数据 JSON，按 (路径, mtime_ns, 文件大小) 缓存解析结果
+
+    stat 参数只用于组成缓存键：重新上传后文件的 mtime/大小会变，旧的缓存自然不再命中。
+    返回的 DataFrame 是缓存里的共享对象，调用方不能原地修改。
+    """
+    return pd.read_parquet(parquet_path), json.loads(metadata_path.read_text(encoding="utf-8"))
+
+
+def _stat_key(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
 def load_frame_dict(parquet_path: str | Path, metadata_path: str | Path | None = None) -> dict[str, pd.DataFrame]:
     parquet_path = Path(parquet_path)
     metadata_path = Path(metadata_path) if metadata_path is not None else _metadata_path(parquet_path)
-    combined = pd.read_parquet(parquet_path)
-    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    # 调参时同一份数据会被反复读取（K=2、3、4、5……），解析结果按文件状态缓存，下面每个组学仍然 copy 一份交给调用方
+    combined, metadata = _read_frame_files(parquet_path, metadata_path, _stat_key(parquet_path), _stat_key(metadata_path))
 
     data: dict[str, pd.DataFrame] = {}
     for frame_meta in metadata.get("frames", []):
@@ -77,55 +122,265 @@ def load_frame_dict(parquet_path: str | Path, metadata_path: str | Path | None =
     return data
 
 
+def _sendfile_copy(src_fd: int, destination: str | Path) -> None:
+    """用 os.sendfile 在内核里把 src_fd 的全部内容拷贝到 destination，数据不经过 Python 的 bytes 对象"""
+    size = os.fstat(src_fd).st_size
+    with open(destination, "wb") as buffer:
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(buffer.fileno(), src_fd, offset, size - offset)  # 显式传 offset，不依赖也不改变源文件当前的读取位置
+            if sent == 0:
+                break
+            offset += sent
+
+
+def _upload_fileno(file: UploadFile) -> int | None:
+    """上传文件已经落到磁盘临时文件上时返回它的文件描述符，否则返回 None
+
+    Starlette 用 SpooledTemporaryFile 接收上传文件，小文件只在内存里。对内存里的文件调用 fileno()
+    会强制把它先写到磁盘上，所以和 Starlette 一样先检查 _rolled，只对已经在磁盘上的文件取 fileno。
+    """
+    if not sys.platform.startswith("linux"):  # macOS 的 sendfile 只能写 socket，Windows 没有 sendfile
+        return None
+    if not getattr(file.file, "_rolled", True):
+        return None
+    try:
+        return file.file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _looks_like_table(head: bytes) -> bool:
+    """根据文件开头一小段排除明显不是表格的文件：空文件，以及除 Excel 以外的二进制文件
+
+    只拒绝明显是二进制的内容。文本是不是合法的表格交给后面的解析器判断：宽矩阵的表头可能比嗅探的这一小段还长，
+    R 的 write.table 输出的表头又比数据行少一列，按行数、分隔符个数去猜很容易把这些合法文件误拒掉。
+    """
+    if not head:
+        return False
+    if head.startswith(SPREADSHEET_MAGIC):
+        return True
+    if b"\x00" in head:
+        return False
+    control = sum(head.count(bytes([c])) for c in range(32) if c not in (9, 10, 13))  # 除了 \t \r \n 以外的控制字符
+    return control <= len(head) * 0.1
+
+
+async def save_upload_file(file: UploadFile, destination: str | Path) -> None:
+    """把用户上传的文件保存到本地磁盘
+
+    写磁盘之前先看一眼文件开头：明显不是表格的文件（空文件、二进制文件）直接返回 400，
+    不用先把可能很大的整个文件写到磁盘上，解析失败后再删掉。
+
+    同步的 open + shutil.copyfileobj 写在 async 接口里会在整个拷贝期间卡住事件循环。
+    大文件已经在磁盘临时文件里时，在线程里用 os.sendfile 让内核直接拷贝；
+    否则用 aiofiles 按 1 MiB 一块异步读写，每块之间事件循环都可以去处理其他请求；
+    块足够大，read/write 系统调用次数也不会多。
+    """
+    head = await file.read(CSV_SNIFF_BYTES)
+    await file.seek(0)
+    if not _looks_like_table(head):
+        raise HTTPException(status_code=400, detail=f"文件 {file.filename} 看起来不是表格文件（CSV/TSV/TXT/Excel），已拒绝上传。")
+
+    src_fd = _upload_fileno(file)
+    if src_fd is not None:
+        try:
+            await asyncio.to_thread(_sendfile_copy, src_fd, destination)
+            return
+        except OSError:
+            pass  # 个别文件系统不支持 sendfile，退回下面的分块拷贝（会覆盖写了一半的文件）
+        await file.seek(0)
+    async with aiofiles.open(destination, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+
+
+def _count_delimiter(lines: list[str], delimiters: str = CSV_DELIMITERS) -> str | None:
+    """csv.Sniffer 判断不出来时的兜底：每一行里出现次数都相同（且不为 0）的候选分隔符里，取出现次数最多的那个"""
+    best, best_count = None, 0
+    for delimiter in delimiters:
+        counts = {line.count(delimiter) for line in lines if line}
+        if len(counts) == 1 and (count := counts.pop()) > best_count:
+            best, best_count = delimiter, count
+    return best
+
+
+def _sniff_csv_layout(file_location: str | Path) -> tuple[str, list[str]] | None:
+    """读取文件开头一小段，猜出分隔符并解析出第一行；看起来不像文本表格时返回 None"""
+    with open(file_location, "rb") as f:
+        head = f.read(CSV_SNIFF_BYTES)
+        if b"\x00" in head:
+            return None  # 二进制文件（比如 Excel），交给 read_excel
+        f.seek(0)
+        first_line = f.readline()  # 宽矩阵的表头可能比 CSV_SNIFF_BYTES 还长，第一行要完整读出来
+    lines = head.decode("utf-8-sig", errors="replace").splitlines()
+    if len(lines) > 1:
+        lines = lines[:-1]  # 最后一行可能被截断，不参与嗅探
+    lines = lines[:CSV_SNIFF_LINES]
+    try:
+        delimiter = csv.Sniffer().sniff("\n".join(lines), delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        #空格放在最后单独判断：逗号/制表符分隔的文件里，样本名、特征名本身也可能带空格
+        #每行空格数都一样的空格分隔文件也能交给pyarrow/C引擎解析，不用再退回很慢的Python引擎
+        delimiter = _count_delimiter(lines) or _count_delimiter(lines, " ")
+        if delimiter is None:
+            return None
+    first_row = next(csv.reader(first_line.decode("utf-8-sig", errors="replace").splitlines()[:1], delimiter=delimiter), [])
+    return delimiter, first_row
+
+
+def _read_csv_with_pyarrow(file_location: str | Path, sep: str, first_row: list[str], header: int | None, index_col: int | None) -> pd.DataFrame | None:
+    """用 pyarrow 的多线程 CSV 读取器解析文件；不适用或解析失败时返回 None，由调用方走 C 引擎
+
+    直接调用 pyarrow.csv 而不是 pd.read_csv(engine="pyarrow")，是为了能指定分块大小，并且在转成 DataFrame 时
+    用 self_destruct 边转换边释放 Arrow 内存，宽矩阵的内存峰值不会是两份数据。
+    （没有用 split_blocks：每列各自成块后，后面的合并、裁剪、写 parquet 反而更慢。）
+    缺失值的识别规则、无表头时的列名、索引列的处理都和 pd.read_csv 保持一致。
+    """
+    if header == 0 and len(set(first_row)) != len(first_row):
+        # pyarrow 遇到重名的表头不会像 pandas 那样改名成 xxx.1，后面按列名处理时会偷偷改动用户数据，所以交给 C 引擎
+        return None
+    try:
+        table = pacsv.read_csv(
+            file_location,
+            read_options=pacsv.ReadOptions(
+                use_threads=True,
+                block_size=max(PYARROW_CSV_BLOCK_SIZE, PYARROW_CSV_BLOCK_ROWS * sum(len(field) + 1 for field in first_row)),  # 用表头的长度估计一行有多宽
+                autogenerate_column_names=header is None,
+            ),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            convert_options=pacsv.ConvertOptions(null_values=list(STR_NA_VALUES), strings_can_be_null=True),
+        )
+    except Exception:
+        return None
+    if any(pa.types.is_temporal(arrow_type) for arrow_type in table.schema.types):
+        # 像日期、时间的列（临床数据里的诊断日期、随访时间等）pyarrow 会推断成 date/time/timestamp 类型，
+        # pandas 的 C 引擎则原样保留成字符串；timestamp_parsers=[] 也关不掉这种推断，所以交给 C 引擎，保证两条路径读出来的表格完全一样
+        return None
+
+    # 整列都是空值的列 pyarrow 会推断成 null 类型，pandas 的做法是当成全 NaN 的 float64 列
+    # （只在确实有这种列时才 cast：cast 会把整张表的每一列都过一遍，宽矩阵上要一秒多）
+    schema = table.schema
+    null_columns = [i for i, arrow_type in enumerate(schema.types) if pa.types.is_null(arrow_type)]
+    if null_columns:
+        for i in null_columns:
+            schema = schema.set(i, schema.field(i).with_type(pa.float64()))
+        table = table.cast(schema)
+
+    df = table.to_pandas(self_destruct=True)
+    del table  # self_destruct 之后 table 不能再使用
+    if header is None:
+        df.columns = range(df.shape[1])  # 和 pandas 一样，无表头时列名为 0,1,2,...
+    elif "" in df.columns:
+        df.columns = [name or f"Unnamed: {i}" for i, name in enumerate(df.columns)]  # 和 pandas 一样，空表头的列命名为 "Unnamed: 列号"
+    if index_col is not None:
+        df = df.set_index(df.columns[index_col])
+        if isinstance(df.index.name, str) and df.index.name.startswith("Unnamed"):
+            df.index.name = None  # pandas 会把 Unnamed 开头的索引名清掉（比如 to_csv 写出的表格左上角是空的）
+    return df
+
+
 def read_uploaded_dataframe(file_location: str | Path, data_format: str, filename: str) -> pd.DataFrame:
-    need_transpose = False
-    read_params = {
-        "sep": None,
-        "engine": "python",
-        "header": 0,
-        "index_col": 0,
+    need_transpose = False #标记是否需要转置
+    read_params = { #因为之后需要使用pd.read_csv或pd.read_excel来读文件，所以这里用一个字典read_params来存储其参数
+        "header": 0, #指定表头行为第0行，表示有表头
+        "index_col": 0, #指定索引列为第0列，表示有索引列
     }
 
     if data_format == "row_sample_yes_yes":
+        # ,特征1,特征2,特征3,...
+        # 病人1,11,12,13
+        # 病人2,21,22,23
+        # ...
         pass
     elif data_format == "row_sample_yes_no":
-        read_params["index_col"] = None
+        # 特征1,特征2,特征3,...
+        # 11,12,13
+        # 21,22,23
+        # ...
+        read_params["index_col"] = None #不指定索引列，于是读取文件时pandas会自动生成索引列0,1,2,...
     elif data_format == "row_sample_no_yes":
-        read_params["header"] = None
+        # 病人1,11,12,13,...
+        # 病人2,21,22,23
+        # ...
+        read_params["header"] = None #不指定表头行，于是读取文件时pandas会自动生成表头行0,1,2,...
     elif data_format == "row_sample_no_no":
+        # 11,12,13,...
+        # 21,22,23
+        # ...
         read_params["header"] = None
         read_params["index_col"] = None
     elif data_format == "row_feature_yes_yes":
+        # ,病人1,病人2,病人3,...
+        # 特征1,11,21,31
+        # 特征2,12,22,32
+        # ...
         need_transpose = True
     elif data_format == "row_feature_yes_no":
+        # 病人1,病人2,病人3,...
+        # 11,21,31
+        # 12,22,32
+        # ...
         read_params["index_col"] = None
         need_transpose = True
     elif data_format == "row_feature_no_yes":
+        # 特征1,11,21,31,...
+        # 特征2,12,22,32
+        # ...
         read_params["header"] = None
         need_transpose = True
     elif data_format == "row_feature_no_no":
+        # 11,21,31,...
+        # 12,22,32
+        # ...
         read_params["header"] = None
         read_params["index_col"] = None
         need_transpose = True
     else:
         raise ValueError(f"Unsupported data format: {data_format}")
 
-    try:
-        df_single = pd.read_csv(file_location, **read_params)
-    except Exception:
-        excel_params = dict(read_params)
-        excel_params.pop("sep", None)
-        excel_params.pop("engine", None)
+    with open(file_location, "rb") as f:
+        is_spreadsheet = f.read(max(len(magic) for magic in SPREADSHEET_MAGIC)).startswith(SPREADSHEET_MAGIC)
+    if is_spreadsheet:
+        #按文件头直接判断是不是Excel，不用先让CSV解析器读一遍二进制文件、失败之后再靠捕获异常退回read_excel #注意想要使用pd.read_excel的话需要安装openpyxl库
         try:
-            df_single = pd.read_excel(file_location, **excel_params)
+            df_single = pd.read_excel(file_location, **read_params)
         except Exception as e_read:
             raise ValueError(f"File {filename} parse failed: {str(e_read)}")
+    else:
+        # 先读文件开头嗅探一次分隔符，之后的解析器都直接用它。sep=None 会强制 pandas 使用纯 Python 引擎来自动嗅探，对宽组学矩阵非常慢
+        df_single = None
+        layout = _sniff_csv_layout(file_location)
+        if layout is not None:
+            sep, first_row = layout
+            # 优先用 pyarrow 引擎解析：它是多线程的 C++ 解析器，对几千上万列的宽组学矩阵比 Python 引擎快一个数量级
+            df_single = _read_csv_with_pyarrow(file_location, sep, first_row, read_params["header"], read_params["index_col"])
+            if df_single is None:
+                try:
+                    df_single = pd.read_csv(file_location, sep=sep, engine="c", low_memory=False, **read_params) #C引擎，low_memory=False整列一次性推断类型，避免同一列被分块推断成混合类型
+                except Exception:
+                    df_single = None
+        if df_single is None:
+            try:
+                df_single = pd.read_csv(file_location, sep=None, engine="python", **read_params) #嗅探不出分隔符（比如每行空格数不一样的文件）时，退回Python引擎自动嗅探
+            except Exception as e_read:
+                raise ValueError(f"File {filename} parse failed: {str(e_read)}")
 
     if need_transpose:
         df_single = df_single.T
     return df_single
 
 
+def _duplicate_labels(labels: pd.Index) -> list:
+    """返回重复出现过的行名/列名（去重后）；没有重复时返回空列表
+
+    只做一次 duplicated() 哈希遍历，判断有没有重复和取出具体是哪些重复都用它的结果，
+    不再先 has_duplicates 再 duplicated() 各走一遍。
+    """
+    mask = labels.duplicated()
+    return labels[mask].unique().tolist() if mask.any() else []
+
+
 def validate_numeric_frame(df: pd.DataFrame, data_label: str, allow_duplicate_columns: bool = False) -> pd.DataFrame:
     if df.empty:
         raise ValueError(f"{data_label} is empty.")
@@ -136,24 +391,155 @@ def validate_numeric_frame(df: pd.DataFrame, data_label: str, allow_duplicate_co
     df.index = df.index.astype(str)
     df.columns = [str(column) for column in df.columns]
 
-    if df.index.has_duplicates:
-        duplicated = df.index[df.index.duplicated()].unique().tolist()
+    if duplicated := _duplicate_labels(df.index):
         raise ValueError(f"{data_label} contains duplicated sample names: {duplicated}")
-    if not allow_duplicate_columns and df.columns.has_duplicates:
-        duplicated = df.columns[df.columns.duplicated()].unique().tolist()
+    if not allow_duplicate_columns and (duplicated := _duplicate_labels(df.columns)):
         raise ValueError(f"{data_label} contains duplicated feature names: {duplicated}")
 
-    numeric_df = df.apply(pd.to_numeric, errors="coerce")
-    missing_count = int(numeric_df.isnull().sum().sum())
-    if missing_count > 0:
-        raise ValueError(f"{data_label} contains {missing_count} missing or non-numeric values.")
-    if not np.isfinite(numeric_df.to_numpy(dtype=float)).all():
+    # 只有非数值列才需要逐列 to_numeric，已经是数值类型的列（绝大多数情况）直接跳过
+    numeric_df = df
+    non_numeric_cols = df.columns[[not pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]]
+    if len(non_numeric_cols) > 0:
+        numeric_df = df.copy()
+        numeric_df[non_numeric_cols] = df[non_numeric_cols].apply(pd.to_numeric, errors="coerce")
+
+    # 一次 isfinite 扫描同时覆盖缺失值和 inf；只有出错时才再数一遍 NaN 用于报错信息
+    values = numeric_df.to_numpy(dtype=float)
+    if not np.isfinite(values).all():
+        missing_count = int(np.isnan(values).sum())
+        if missing_count > 0:
+            raise ValueError(f"{data_label} contains {missing_count} missing or non-numeric values.")
         raise ValueError(f"{data_label} contains non-finite values.")
     return numeric_df
 
 
 
 
+def _upload_digest(file_locations: list[str], file_keys: list[str], data_format: str, file_type: str) -> str:
+    """计算一次上传的摘要：各文件的内容、各文件对应的组学类型（临床数据为空）以及数据格式选项
+
+    不包含文件名：前端每次上传都会给文件换一个新的名字，摘要里带上文件名的话同一个文件永远不会命中。
+
+    摘要相同说明解析、合并、校验之后得到的数据也一定相同。blake2b 是标准库里最快的安全哈希之一，
+    按 UPLOAD_CHUNK_SIZE 分块读刚写好的文件（还在页缓存里），比起解析表格几乎不花时间。
+    """
+    digest = hashlib.blake2b(f"{file_type}\0{data_format}".encode())
+    for file_location, file_key in zip(file_locations, file_keys):
+        digest.update(f"\0{file_key}\0".encode())
+        with open(file_location, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cached_upload(upload_path: str, file_type: str, digest: str) -> dict[str, Any] | None:
+    """上一次保存的数据就是由完全相同的上传得到的时候，返回当时记录的上传信息；否则返回 None"""
+    parquet_filename, metadata_filename = input_data_files(file_type)
+    metadata_location = os.path.join(upload_path, metadata_filename)
+    if not os.path.exists(os.path.join(upload_path, parquet_filename)) or not os.path.exists(metadata_location):
+        return None
+    try:
+        upload_info = json.loads(Path(metadata_location).read_text(encoding="utf-8")).get("upload")
+    except (OSError, ValueError):
+        return None
+    if not isinstance(upload_info, dict) or upload_info.get("digest") != digest:
+        return None
+    return upload_info
+
+
+def _merge_uploaded_frames(data_dict: dict[str, pd.DataFrame]) -> tuple[pd.DataFrame, int]:
+    """按样本交集临时合并各个文件，返回 (合并后的表格, 因取交集被丢掉的样本数)"""
+    dataframes=list(data_dict.values())
+    if not dataframes:
+        raise ValueError("未上传有效文件")
+
+    # 【新增】计算取交集前，所有文件包含的“去重样本总数”
+    all_samples = set()
+    for df in dataframes:
+        all_samples.update(df.index)
+    total_unique_samples = len(all_samples)
+
+    df_concat=pd.concat(dataframes,axis=1,join='inner') #axis=1表示在每一行后面拼接，即按列拼接；join='inner'表示取索引的交集，即“如果病人名称有对不上的，那么取病人名称的交集”
+    if df_concat.empty:
+        raise ValueError("合并后数据为空！请检查数据格式选项是否正确，以及所有文件的病人名称是否一致。")
+
+    # 【新增】计算被过滤掉的“丢失”样本数
+    intersected_samples = len(df_concat.index)
+    lost_samples = total_unique_samples - intersected_samples
+    return df_concat, lost_samples
+
+
+def _iter_float_blocks(df: pd.DataFrame):
+    """按 VALIDATION_BLOCK_COLUMNS 列一块，依次把 df 转成 float 数组"""
+    for start in range(0, df.shape[1], VALIDATION_BLOCK_COLUMNS):
+        yield df.iloc[:, start:start + VALIDATION_BLOCK_COLUMNS].to_numpy(dtype=float)
+
+
+def _validate_and_save_upload(data_dict: dict[str, pd.DataFrame], df_concat: pd.DataFrame, file_type: str, upload_path: str, upload_info: dict[str, Any] | None = None) -> None:
+    """检查合并后的文件内容合不合规，合规的话把各组学数据裁剪到交集样本后保存成 parquet；不合规时抛出 ValueError"""
+    if df_concat.shape[1]<1: #确保df_concat至少有一列特征数据，防止读到内容为空或者仅有样本名称的文件
+        raise ValueError("未检测到有效的数据列。")
+    if duplicated:=_duplicate_labels(df_concat.index): #检查df_concat样本名称是否重复，同时拿到具体的重复样本名
+        raise ValueError(f"合并后发现重复样本名: {duplicated}。")
+    if duplicated:=_duplicate_labels(df_concat.columns): #检查df_concat特征名称是否重复
+        raise ValueError(f"合并后发现重复特征名: {duplicated}。")
+    if file_type=="omics": #如果是组学数据，那么检查整个表格中是否有缺失值、是否有非数字内容
+        #先看列类型：.select_dtypes(exclude=[np.number])可以筛选出所有非数字类型（非int、float）的列。这一步只读每列的dtype，不扫描数据
+        non_numeric_cols=df_concat.select_dtypes(exclude=[np.number]).columns.tolist()
+        if len(non_numeric_cols)>0:
+            raise ValueError(f"检测到以下列包含非数字内容: {non_numeric_cols}。请确保除表头行索引列外，其他所有单元格均为数字。")
+        #此时所有列都是数字，缺失值就是NaN：转成float数组后只用一次np.isfinite扫描，同时查出缺失值和inf，不用先生成一个和原表格一样大的布尔DataFrame
+        #按列分块转换和扫描，每次只多占 样本数×VALIDATION_BLOCK_COLUMNS 的内存，不会为了校验把整个大矩阵再复制一份
+        #绝大多数上传的数据都是干净的，只有这一步发现问题时才再数一遍缺失值个数用于报错信息
+        if not all(np.isfinite(block).all() for block in _iter_float_blocks(df_concat)):
+            missing_count=sum(int(np.isnan(block).sum()) for block in _iter_float_blocks(df_concat))
+            if missing_count>0:
+                raise ValueError(f"检测到数据中包含 {missing_count} 个缺失值，请手动清理或补全数据。")
+            raise ValueError("检测到数据中包含无穷大（inf）数值，请手动清理数据。")
+    else: #如果是临床数据，那么检查OS、OS.time这两列数据中是否有缺失值、是否有非数字内容
+        if 'OS' not in df_concat.columns or 'OS.time' not in df_concat.columns: #检查有没有"OS"、"OS.time"两列
+            raise ValueError("临床数据必须包含 'OS' (生存状态，1=死亡，0=存活) 和 'OS.time' (生存时间) 两列。")
+        missing_count=int(df_concat[['OS','OS.time']].isnull().to_numpy().sum())
+        if missing_count>0:
+            raise ValueError(f"检测到 'OS' 或 'OS.time' 列包含 {missing_count} 个缺失值，请手动清理或补全数据。")
+        non_numeric_cols=df_concat[['OS','OS.time']].select_dtypes(exclude=[np.number]).columns.tolist()
+        if len(non_numeric_cols)>0:
+            raise ValueError(f"检测到以下列包含非数字内容: {non_numeric_cols}。请确保这两个列只包含数字。")
+
+    #upload.py 保存前会把各组学数据裁剪到已校验过的交集样本；样本本来就和交集完全一致时（比如只上传了一个文件）直接保存，不再按索引重排复制一遍
+    data_dict = {key: df if df.index.equals(df_concat.index) else df.loc[df_concat.index] for key, df in data_dict.items()}
+
+    # 保存输入数据：DataFrame 内容写入 parquet，字典结构等元数据写入 JSON。
+    parquet_filename, metadata_filename = input_data_files(file_type)
+    final_file_location=os.path.join(upload_path, parquet_filename)
+    final_metadata_location=os.path.join(upload_path, metadata_filename)
+    legacy_joblib_location=os.path.join(upload_path, "omics_data.joblib" if file_type=="omics" else "clinical_data.joblib")
+    for existing_path in (final_file_location, final_metadata_location, legacy_joblib_location):
+        if os.path.exists(existing_path):
+            os.remove(existing_path)
+    save_frame_dict(data_dict, final_file_location, final_metadata_location, upload_info)
+    # # 5.接下来我们要把合并后的文件保存到本地
+    # final_filename=f"{uuid.uuid4()}.csv" #给合并后的文件起个名
+    # final_file_location=os.path.join(upload_path,final_filename) #得到合并后的文件的保存路径
+    # df.to_csv(final_file_location) #把合并后的文件保存到本地
+    # #此时保存下来的df就很标准了，行代表病人，列代表特征。有表头行、有索引列
+    # #保存下来的文件，分隔符使用的是英文逗号，因为to_csv()函数的默认分隔符就是英文逗号
+    # #这样一来，"/api/run"接口就可以直接使用pd.read_csv(file_path,header=0,index_col=0,sep=',')读取输入数据了
+
+
+async def _gather_in_order(aws) -> list:
+    """同时执行 aws 里的所有任务，按顺序返回结果
+
+    return_exceptions=True 让所有任务都结束（或失败）之后再统一处理错误，不会在还有文件正在写入时就去删文件；
+    然后按顺序抛出第一个错误，和逐个处理文件时报的是同一个错
+    """
+    results=await asyncio.gather(*aws,return_exceptions=True)
+    for result in results:
+        if isinstance(result,BaseException):
+            raise result
+    return results
+
+
 # 创建路由器实例
 router=APIRouter()
 
@@ -164,7 +550,7 @@ async def upload_file(   files:List[UploadFile]=File(...)   ,   data_format:str=
 # <--- 【新增】接收前端传来的组学映射 JSON 字符串，默认为空字典字符串
 #files是用户上传的文件对象；data_format是用户选择的数据格式；file_type标记用户上传的文件是组学数据还是临床数据，默认组学；session_id是会话ID #(...)表示该对象必填，前端传来的东西必须包含该对象
 
-    print(f"\n[日志] 接口 /api/upload 开始调用。会话ID：{session_id}")
+    logger.info(f"[日志] 接口 /api/upload 开始调用。会话ID：{session_id}")
 
     #接下来我们打算：【【【【【
     # 1.把各个文件都保存到本地
@@ -188,96 +574,38 @@ async def upload_file(   files:List[UploadFile]=File(...)   ,   data_format:str=
         mapping = {}
 
     try:
-        for file in files: #遍历用户上传的每一个文件
-
-            # 1.把用户上传的各个文件都保存到本地
-            # 1. 此时 file.filename 已经是前端传来的 UUID 了
-            file_location=os.path.join(UPLOAD_PATH,file.filename) #得到该文件的保存路径 【【【【【目前我没有使用uuid将该文件改名，以及之后把df_single放进字典时键名也是该文件名，这是因为之后可能有算法处理数据时是不同组学不同处理方式的，我打算根据文件名来判断对应文件是什么组学。以后要不要在前端加个选项？
-            temp_file_paths.append(file_location) #记录该文件的路径，以便后续删除这些文件
-            with open(file_location,"wb") as buffer: #open(file_location,"wb")表示在file_location这个路径打开或新建一个文件，"wb"表示写入二进制数据；with ... as buffer是Python的上下文管理器，于是无论后续写入是否成功，它都会在操作结束后自动关闭文件。buffer是给打开的本地文件流（就是file_location这个路径）起的名字
-                shutil.copyfileobj(file.file,buffer) #可以将file.file这个文件对象复制到buffer。于是实现把文件保存到本地磁盘的指定路径中
-
-            # 2.根据用户选择的数据格式读取各个文件（因为用户可能会把文件后缀名改成.fea之类的，所以我们不检查文件后缀名）
-            df_single=None
-            need_transpose=False #标记是否需要转置
-            read_params={ #因为之后需要使用pd.read_csv或pd.read_excel来读文件，所以这里用一个字典read_params来存储其参数
-                "sep": None, #分隔符，默认None，表示自动嗅探分隔符
-                "engine": "python", #使用Python引擎，这样才能支持自动嗅探分隔符
-                "header": 0, #指定表头行为第0行，表示有表头
-                "index_col": 0 #指定索引列为第0列，表示有索引列
+        # 1.把用户上传的各个文件都保存到本地
+        # 1. 此时 file.filename 已经是前端传来的 UUID 了
+        #得到每个文件的保存路径 【【【【【目前我没有使用uuid将该文件改名，以及之后把df_single放进字典时键名也是该文件名，这是因为之后可能有算法处理数据时是不同组学不同处理方式的，我打算根据文件名来判断对应文件是什么组学。以后要不要在前端加个选项？
+        file_locations=[os.path.join(UPLOAD_PATH,file.filename) for file in files]
+        temp_file_paths.extend(file_locations) #先记录所有文件的路径，这样不管哪个文件出错，后面都能把已经写到磁盘上的文件删干净
+
+        #各个文件的保存互不依赖，用asyncio.gather同时进行
+        await _gather_in_order(save_upload_file(file,file_location) for file,file_location in zip(files,file_locations)) #把用户上传的文件按1 MiB一块异步复制到file_location。于是实现把文件保存到本地磁盘的指定路径中
+
+        #用户经常把同一批文件、同样的选项重新上传一遍（比如回到上一步再点一次上传）。先算一下这次上传的摘要，
+        #和上次保存的数据记录的摘要一样的话，解析、合并、校验的结果也一定一样，直接沿用已经保存好的parquet
+        #（parquet文件不动，它的mtime不变，/api/run的结果缓存也还能继续命中）
+        #组学数据的键名是组学类型，会出现在特征名里，所以算进摘要；临床数据的键名是文件名，只是字典的键，其他接口都只取第一个表格，不影响保存的数据
+        file_keys=[mapping.get(file.filename,"Unknown") if file_type=="omics" else "" for file in files]
+        digest=await asyncio.to_thread(_upload_digest,file_locations,file_keys,data_format,file_type)
+        cached=await asyncio.to_thread(_cached_upload,UPLOAD_PATH,file_type,digest)
+        if cached is not None:
+            cleanup_temp_files(temp_file_paths)
+            logger.info(f"[日志] 上传内容与已保存的数据相同，跳过解析。会话ID：{session_id}")
+            return{
+                "status": "success",
+                "original_filename": " + ".join(f.filename for f in files),
+                "original_shape": None,
+                "lost_samples": cached.get("lost_samples", 0),
+                "message": f"成功合并 {len(files)} 个文件"
             }
-            if data_format=="row_sample_yes_yes": #如果前端传过来的data_format为"row_sample_yes_yes"
-                # ,特征1,特征2,特征3,...
-                # 病人1,11,12,13
-                # 病人2,21,22,23
-                # 病人3,31,32,33
-                # ...
-                pass
-            elif data_format=="row_sample_yes_no":
-                # 特征1,特征2,特征3,...
-                # 11,12,13
-                # 21,22,23
-                # 31,32,33
-                # ...
-                read_params["index_col"]=None #不指定索引列，于是读取文件时pandas会自动生成索引列0,1,2,...
-            elif data_format=="row_sample_no_yes":
-                # 病人1,11,12,13,...
-                # 病人2,21,22,23
-                # 病人3,31,32,33
-                # ...
-                read_params["header"]=None #不指定表头行，于是读取文件时pandas会自动生成表头行0,1,2,...
-            elif data_format=="row_sample_no_no":
-                # 11,12,13,...
-                # 21,22,23
-                # 31,32,33
-                # ...
-                read_params["header"]=None
-                read_params["index_col"]=None
-            elif data_format=="row_feature_yes_yes":
-                # ,病人1,病人2,病人3,...
-                # 特征1,11,21,31
-                # 特征2,12,22,32
-                # 特征3,13,23,33
-                # ...
-                need_transpose=True
-            elif data_format=="row_feature_yes_no":
-                # 病人1,病人2,病人3,...
-                # 11,21,31
-                # 12,22,32
-                # 13,23,33
-                # ...
-                read_params["index_col"]=None
-                need_transpose=True
-            elif data_format=="row_feature_no_yes":
-                # 特征1,11,21,31,...
-                # 特征2,12,22,32
-                # 特征3,13,23,33
-                # ...
-                read_params["header"]=None
-                need_transpose=True
-            elif data_format=="row_feature_no_no":
-                # 11,21,31,...
-                # 12,22,32
-                # 13,23,33
-                # ...
-                read_params["header"]=None
-                read_params["index_col"]=None
-                need_transpose=True
-            try: #首先我们尝试用pd.read_csv读文件
-                df_single=pd.read_csv(file_location,**read_params)
-                #**是Python的字典解包语法，可以把 字典键值对 拆解成 函数参数 
-                #假设有一个函数需要两个参数：def hanshu(a,b)
-                #普通调用方式：hanshu(a=1,b=2)
-                #使用**的调用方式：hanshu(**{"a":1,"b":2})
-            except: #如果读取失败，那么尝试用pd.read_excel读文件。不过pd.read_excel不支持sep和engine参数，所以我们先来删除它们 #注意想要使用pd.read_excel的话需要安装openpyxl库
-                del read_params["sep"]
-                del read_params["engine"]
-                try:
-                    df_single=pd.read_excel(file_location,**read_params)
-                except Exception as e_read: #如果还是读取失败，那么抛出的错误会被最外层的except Exception as e捕获，删除用户上传的各个文件同时抛出HTTPException
-                    raise ValueError(f"文件 {file.filename} 解析失败: {str(e_read)}") #注意因为这里的文件名是使用uuid改名后的，所以以后或许可以考虑一下，显示用户上传的原始文件名而不是使用uuid改名后的文件名？【【【【【
-            if need_transpose: #如果需要转置
-                df_single=df_single.T
+
+        # 2.根据用户选择的数据格式读取各个文件（因为用户可能会把文件后缀名改成.fea之类的，所以我们不检查文件后缀名）
+        #解析CSV/Excel是纯CPU的同步操作，大文件要好几秒，放进线程里执行，这期间事件循环还能处理其他请求（比如/api/run）；各个文件也在各自的线程里同时解析
+        results=await _gather_in_order(asyncio.to_thread(read_uploaded_dataframe,file_location,data_format,file.filename) for file,file_location in zip(files,file_locations))
+
+        for file,df_single in zip(files,results): #遍历用户上传的每一个文件，顺序与上传顺序一致
 
             # 获取基础的组学类型，作为 data_dict 的键名
             if file_type == "omics":
@@ -300,64 +628,11 @@ async def upload_file(   files:List[UploadFile]=File(...)   ,   data_format:str=
             # data_dict[file.filename]=df_single #将读取到的df_single存入字典data_dict
 
         # 3.循环结束，此时字典data_dict里面应该就已经存放好了读取到并且处理好的各个文件，所以我们来临时合并一下，检查合并后的文件内容合不合规，有没有脏数据什么的
-        dataframes=list(data_dict.values())
-        if not dataframes:
-            raise ValueError("未上传有效文件")
-
-        # 【新增】计算取交集前，所有文件包含的“去重样本总数”
-        all_samples = set()
-        for df in dataframes:
-            all_samples.update(df.index)
-        total_unique_samples = len(all_samples)
-
-        df_concat=pd.concat(dataframes,axis=1,join='inner') #axis=1表示在每一行后面拼接，即按列拼接；join='inner'表示取索引的交集，即“如果病人名称有对不上的，那么取病人名称的交集”
-        if df_concat.empty:
-            raise ValueError("合并后数据为空！请检查数据格式选项是否正确，以及所有文件的病人名称是否一致。")
-
-        # 【新增】计算被过滤掉的“丢失”样本数
-        intersected_samples = len(df_concat.index)
-        lost_samples = total_unique_samples - intersected_samples
+        #合并、校验、写parquet都是阻塞的pandas/磁盘操作，数据量大时要好几秒，同样放进线程里执行，不卡住事件循环
+        df_concat, lost_samples = await asyncio.to_thread(_merge_uploaded_frames, data_dict)
 
         try:
-            if df_concat.shape[1]<1: #确保df_concat至少有一列特征数据，防止读到内容为空或者仅有样本名称的文件
-                raise ValueError("未检测到有效的数据列。")
-            if df_concat.index.has_duplicates: #检查df_concat样本名称是否重复
-                raise ValueError(f"合并后发现重复样本名: {   df_concat.index[df_concat.index.duplicated()].unique().tolist()   }。") #这样可以获取具体的重复样本名
-            if df_concat.columns.has_duplicates: #检查df_concat特征名称是否重复
-                raise ValueError(f"合并后发现重复特征名: {   df_concat.columns[df_concat.columns.duplicated()].unique().tolist()   }。")
-            if file_type=="omics": #如果是组学数据，那么检查整个表格中是否有缺失值、是否有非数字内容
-                if df_concat.isnull().sum().sum()>0: #.isnull()会返回一个和原表格形状完全相同的新表格，其中原表格是空值的地方显示True，不是空值的地方显示False，然后再对它.sum().sum()就可以得到原表格中空值的总数了
-                    raise ValueError(f"检测到数据中包含 {df_concat.isnull().sum().sum()} 个缺失值，请手动清理或补全数据。")
-                non_numeric_cols=df_concat.select_dtypes(exclude=[np.number]).columns.tolist() #.select_dtypes(exclude=[np.number])可以筛选出所有非数字类型（非int、float）的列
-                if len(non_numeric_cols)>0:
-                    raise ValueError(f"检测到以下列包含非数字内容: {non_numeric_cols}。请确保除表头行索引列外，其他所有单元格均为数字。")
-            else: #如果是临床数据，那么检查OS、OS.time这两列数据中是否有缺失值、是否有非数字内容
-                if 'OS' not in df_concat.columns or 'OS.time' not in df_concat.columns: #检查有没有"OS"、"OS.time"两列
-                    raise ValueError("临床数据必须包含 'OS' (生存状态，1=死亡，0=存活) 和 'OS.time' (生存时间) 两列。")
-                if df_concat[['OS','OS.time']].isnull().sum().sum()>0:
-                    raise ValueError(f"检测到 'OS' 或 'OS.time' 列包含 {df_concat[['OS','OS.time']].isnull().sum().sum()} 个缺失值，请手动清理或补全数据。")
-                non_numeric_cols=df_concat[['OS','OS.time']].select_dtypes(exclude=[np.number]).columns.tolist()
-                if len(non_numeric_cols)>0:
-                    raise ValueError(f"检测到以下列包含非数字内容: {non_numeric_cols}。请确保这两个列只包含数字。")
-
-            data_dict = {key: df.loc[df_concat.index].copy() for key, df in data_dict.items()} #upload.py 保存前会把各组学数据裁剪到已校验过的交集样本
-
-            # 保存输入数据：DataFrame 内容写入 parquet，字典结构等元数据写入 JSON。
-            parquet_filename, metadata_filename = input_data_files(file_type)
-            final_file_location=os.path.join(UPLOAD_PATH, parquet_filename)
-            final_metadata_location=os.path.join(UPLOAD_PATH, metadata_filename)
-            legacy_joblib_location=os.path.join(UPLOAD_PATH, "omics_data.joblib" if file_type=="omics" else "clinical_data.joblib")
-            for existing_path in (final_file_location, final_metadata_location, legacy_joblib_location):
-                if os.path.exists(existing_path):
-                    os.remove(existing_path)
-            save_frame_dict(data_dict, final_file_location, final_metadata_location)
-            # # 5.接下来我们要把合并后的文件保存到本地
-            # final_filename=f"{uuid.uuid4()}.csv" #给合并后的文件起个名
-            # final_file_location=os.path.join(UPLOAD_PATH,final_filename) #得到合并后的文件的保存路径
-            # df.to_csv(final_file_location) #把合并后的文件保存到本地
-            # #此时保存下来的df就很标准了，行代表病人，列代表特征。有表头行、有索引列
-            # #保存下来的文件，分隔符使用的是英文逗号，因为to_csv()函数的默认分隔符就是英文逗号
-            # #这样一来，"/api/run"接口就可以直接使用pd.read_csv(file_path,header=0,index_col=0,sep=',')读取输入数据了
+            await asyncio.to_thread(_validate_and_save_upload, data_dict, df_concat, file_type, UPLOAD_PATH, {"digest": digest, "lost_samples": lost_samples})
 
             # 6.删除用户上传的各个文件
             cleanup_temp_files(temp_file_paths)
@@ -367,7 +642,7 @@ async def upload_file(   files:List[UploadFile]=File(...)   ,   data_format:str=
         return{
             "status": "success",
             # "filename": final_filename, #合并后的文件名称
-            "original_filename": " + ".join([f.filename for f in files]), #用户上传的各个文件的原始名称。用于前端界面展示【【【【【这句代码是什么意思？
+            "original_filename": " + ".join(f.filename for f in files), #用户上传的各个文件的原始名称。用于前端界面展示【【【【【这句代码是什么意思？
             # "filepath": final_file_location, #合并后的文件的路径
             "original_shape": None, #这个之后删掉【【【【【
             # "final_shape": df.shape, #最终用于分析的文件形状
@@ -376,11 +651,11 @@ async def upload_file(   files:List[UploadFile]=File(...)   ,   data_format:str=
         }
     except HTTPException as he: #捕获到了我们刚才自己抛出的错误，说明虽然读取、合并文件成功，但是文件内容不合规
         cleanup_temp_files(temp_file_paths) #删除用户上传的各个文件
-        print(f"[后端日志] 校验不通过，文件已删除: {str(he)}")
+        logger.warning(f"[后端日志] 校验不通过，文件已删除: {str(he)}")
         raise he #直接抛出错误给前端
     except Exception as e: #说明读取文件失败，或者其他什么错误
         cleanup_temp_files(temp_file_paths) #删除用户上传的各个文件
-        print(f"[后端日志] 严重错误，文件已删除: {str(e)}")
+        logger.error(f"[后端日志] 严重错误，文件已删除: {str(e)}")
         raise HTTPException(status_code=500,detail=f"服务器内部错误: {str(e)}") #抛出错误给前端
 
 
@@ -404,11 +679,13 @@ async def upload_expression_matrix(
     temp_paths = [temp_path]
 
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload_file(file, temp_path)
 
-        df = read_uploaded_dataframe(temp_path, data_format, original_name)
-        df = validate_numeric_frame(
+        # Parsing, validation and the parquet write are blocking; run them in a worker thread
+        # so other requests are still served while a large matrix is being processed.
+        df = await asyncio.to_thread(read_uploaded_dataframe, temp_path, data_format, original_name)
+        df = await asyncio.to_thread(
+            validate_numeric_frame,
             df,
             "mRNA expression matrix",
             allow_duplicate_columns=True,
@@ -421,7 +698,7 @@ async def upload_expression_matrix(
             if os.path.exists(existing_path):
                 os.remove(existing_path)
 
-        save_frame_dict({"mRNA Expression Matrix": df}, final_file_location, final_metadata_location)
+        await asyncio.to_thread(save_frame_dict, {"mRNA Expression Matrix": df}, final_file_location, final_metadata_location)
         cleanup_temp_files(temp_paths)
 
         return {
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 后端模块都是按 backend/ 为根目录导入的（from routers.upload import ...），测试也一样
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
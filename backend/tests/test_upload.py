@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from routers.upload import (
+    CSV_SNIFF_BYTES,
+    _looks_like_table,
+    _read_csv_with_pyarrow,
+    _sniff_csv_layout,
+    read_uploaded_dataframe,
+)
+
+
+def _head(path):
+    with open(path, "rb") as f:
+        return f.read(CSV_SNIFF_BYTES)
+
+
+def test_empty_upload_is_rejected():
+    assert not _looks_like_table(b"")
+
+
+def test_binary_upload_is_rejected():
+    assert not _looks_like_table(b"\x7fELF\x02\x01\x01\x00" + bytes(range(256)))
+
+
+def test_space_delimited_matrix_with_header_longer_than_sniff_window(tmp_path):
+    # 表头一行就超过了嗅探的 64 KiB，嗅探窗口里只有一行被截断的表头
+    path = tmp_path / "wide.txt"
+    df = pd.DataFrame(
+        np.random.default_rng(0).normal(size=(5, 20000)),
+        index=[f"s{i}" for i in range(5)],
+        columns=[f"g{j}" for j in range(20000)],
+    )
+    df.to_csv(path, sep=" ")
+
+    assert _looks_like_table(_head(path))
+    assert read_uploaded_dataframe(path, "row_sample_yes_yes", "wide.txt").shape == (5, 20000)
+
+
+def test_r_write_table_output_with_short_header(tmp_path):
+    # R 的 write.table 默认不给行名那一列写表头，表头比数据行少一个字段
+    path = tmp_path / "r.txt"
+    path.write_text('"a" "b" "c"\n"s1" 1 2 3\n"s2" 4 5 6\n')
+
+    assert _looks_like_table(_head(path))
+    df = read_uploaded_dataframe(path, "row_sample_yes_yes", "r.txt")
+    assert df.index.tolist() == ["s1", "s2"]
+    assert df.columns.tolist() == ["a", "b", "c"]
+    assert df.to_numpy().tolist() == [[1, 2, 3], [4, 5, 6]]
+
+
+def _read_with_c_engine(path):
+    return pd.read_csv(path, sep=",", engine="c", low_memory=False, header=0, index_col=0)
+
+
+def test_clinical_file_with_dates_matches_c_engine(tmp_path):
+    path = tmp_path / "clinical.csv"
+    path.write_text(
+        "id,OS,OS.time,diagnosis_date,last_visit,stage,smoker\n"
+        "P1,1,100,2020-01-05,2020-01-05 10:00:00,II,TRUE\n"
+        "P2,0,250,2019-11-30,2020-02-01 08:00:00,III,FALSE\n"
+        "P3,1,80,,,I,True\n"
+    )
+
+    df = read_uploaded_dataframe(path, "row_sample_yes_yes", "clinical.csv")
+    pd.testing.assert_frame_equal(df, _read_with_c_engine(path))
+    assert df["diagnosis_date"].tolist()[:2] == ["2020-01-05", "2019-11-30"]
+
+
+def test_pyarrow_reader_matches_c_engine_on_numeric_matrix(tmp_path):
+    path = tmp_path / "omics.csv"
+    df = pd.DataFrame(
+        np.random.default_rng(0).normal(size=(6, 4)),
+        index=[f"s{i}" for i in range(6)],
+        columns=[f"g{j}" for j in range(4)],
+    )
+    df.iloc[2, 1] = np.nan
+    df.to_csv(path)
+
+    sep, first_row = _sniff_csv_layout(path)
+    pyarrow_df = _read_csv_with_pyarrow(path, sep, first_row, 0, 0)
+    assert pyarrow_df is not None
+    pd.testing.assert_frame_equal(pyarrow_df, _read_with_c_engine(path))
@@ -0,0 +1,43 @@
+import uuid
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import upload
+
+
+def _clinical_csv():
+    df = pd.DataFrame(
+        {"OS": [1, 0, 1], "OS.time": [100, 250, 80], "stage": ["I", "II", "III"]},
+        index=["P1", "P2", "P3"],
+    )
+    return df.to_csv().encode()
+
+
+def test_same_clinical_file_uploaded_twice_is_parsed_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 上传的文件和解析结果都保存在当前目录的 upload/ 下
+    parsed = []
+
+    def counting_reader(*args, **kwargs):
+        parsed.append(args)
+        return read_uploaded_dataframe(*args, **kwargs)
+
+    read_uploaded_dataframe = upload.read_uploaded_dataframe
+    monkeypatch.setattr(upload, "read_uploaded_dataframe", counting_reader)
+
+    app = FastAPI()
+    app.include_router(upload.router)
+    client = TestClient(app)
+    content = _clinical_csv()
+    for _ in range(2):
+        # 前端每次上传都会给文件起一个新名字
+        response = client.post(
+            "/api/upload",
+            data={"data_format": "row_sample_yes_yes", "file_type": "clinical", "session_id": "s1"},
+            files=[("files", (f"{uuid.uuid4()}.csv", content))],
+        )
+        assert response.status_code == 200, response.text
+
+    assert len(parsed) == 1
+    assert (tmp_path / "upload" / "s1" / upload.CLINICAL_DATA_FILE).exists()